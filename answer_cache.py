@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+
+# =========================
+# 🔹 Semantic Answer Cache
+# =========================
+class AnswerCache:
+    """Answers keyed by question embedding and corpus version.
+
+    A question hits when a cached question asked against the same corpus
+    version is at least ``threshold`` cosine-similar and younger than
+    ``ttl_seconds``. Entries are evicted least-recently-used beyond
+    ``max_entries``. Identical questions that arrive while the first one is
+    still being answered wait for that answer instead of calling the LLM
+    again.
+
+    Entries are also keyed by the normalized question text, so a repeated
+    question is served without embedding it, and answers produced without
+    an embedding (``query_vector=None``) can still be reused verbatim.
+    """
+
+    def __init__(self, max_entries=2000, ttl_seconds=24 * 3600, threshold=0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._by_version = {}
+        self._by_text = {}
+        self._in_flight = {}
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        keys = self._by_version[entry["version"]]
+        keys.remove(key)
+        if not keys:
+            del self._by_version[entry["version"]]
+        text_key = entry["text_key"]
+        if text_key is not None and self._by_text.get(text_key) == key:
+            del self._by_text[text_key]
+
+    def _expire(self, version, now):
+        for key in list(self._by_version.get(version, ())):
+            if now - self._entries[key]["created"] > self.ttl_seconds:
+                self._drop(key)
+
+    def lookup_text(self, question, version):
+        """Cached (answer, sources) for the same question text, or None"""
+        with self._lock:
+            self._expire(version, time.monotonic())
+            key = self._by_text.get(self._flight_key(question, version))
+            if key is None:
+                return None
+            self._entries.move_to_end(key)
+            entry = self._entries[key]
+            return entry["answer"], entry["sources"]
+
+    def lookup(self, query_vector, version):
+        """Cached (answer, sources) for a similar question, or None"""
+        query = self._normalize(query_vector)
+        with self._lock:
+            self._expire(version, time.monotonic())
+            keys = [key for key in self._by_version.get(version, ()) if self._entries[key]["vector"] is not None]
+            if not keys:
+                return None
+            matrix = np.stack([self._entries[key]["vector"] for key in keys])
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            self._entries.move_to_end(keys[best])
+            entry = self._entries[keys[best]]
+            return entry["answer"], entry["sources"]
+
+    def store(self, query_vector, version, answer, sources, question=None):
+        text_key = self._flight_key(question, version) if question is not None else None
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = {
+                "vector": self._normalize(query_vector) if query_vector is not None else None,
+                "text_key": text_key,
+                "version": version,
+                "answer": answer,
+                "sources": sources,
+                "created": time.monotonic(),
+            }
+            self._by_version.setdefault(version, []).append(key)
+            if text_key is not None:
+                self._by_text[text_key] = key
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    @staticmethod
+    def _flight_key(question, version):
+        return version, " ".join(question.lower().split())
+
+    def join_or_lead(self, question, version):
+        """Return (future, leader): leaders must answer and then call finish() or fail()"""
+        flight_key = self._flight_key(question, version)
+        with self._lock:
+            future = self._in_flight.get(flight_key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._in_flight[flight_key] = future
+            return future, True
+
+    def finish(self, question, query_vector, version, answer, sources):
+        """Store a leader's answer and hand it to everyone waiting on it"""
+        self.store(query_vector, version, answer, sources, question=question)
+        with self._lock:
+            future = self._in_flight.pop(self._flight_key(question, version), None)
+        if future is not None:
+            future.set_result((answer, sources))
+
+    def fail(self, question, version, error):
+        """Release everyone waiting on a leader that could not answer"""
+        with self._lock:
+            future = self._in_flight.pop(self._flight_key(question, version), None)
+        if future is not None:
+            future.set_exception(error)
+
+    def get_or_compute(self, question, query_vector, version, compute):
+        """Serve from cache, join an identical in-flight question, or call compute()"""
+        cached = self.lookup_text(question, version)
+        if cached is None:
+            cached = self.lookup(query_vector, version)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        future, leader = self.join_or_lead(question, version)
+        if not leader:
+            self.hits += 1
+            return future.result()
+
+        self.misses += 1
+        try:
+            answer, sources = compute()
+        except BaseException as e:
+            self.fail(question, version, e)
+            raise
+        self.finish(question, query_vector, version, answer, sources)
+        return answer, sources
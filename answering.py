@@ -0,0 +1,215 @@
+import logging
+import os
+import time
+
+from context_builder import build_context, estimate_tokens
+from lexical_index import is_keyword_query, reciprocal_rank_fusion
+from telemetry import TELEMETRY
+
+
+# =========================
+# 🔹 Retrieval & Answering
+# =========================
+# The question-answering path shared by the app (main.stream_answer) and
+# benchmark.py: answer cache, keyword fast path, hybrid retrieval, MMR
+# context assembly under a token budget, then the LLM.
+HYBRID_CANDIDATES = int(os.environ.get("IQBOT_HYBRID_CANDIDATES", "20"))
+CONTEXT_CANDIDATES = int(os.environ.get("IQBOT_CONTEXT_CANDIDATES", "20"))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("IQBOT_CONTEXT_TOKEN_BUDGET", "1000"))
+CONTEXT_MAX_CHUNKS = int(os.environ.get("IQBOT_CONTEXT_MAX_CHUNKS", "8"))
+CONTEXT_DIVERSITY = float(os.environ.get("IQBOT_CONTEXT_DIVERSITY", "0.3"))
+CONTEXT_SENTENCE_WINDOW = int(os.environ.get("IQBOT_CONTEXT_SENTENCE_WINDOW", "1"))
+
+# Prompt sizes are logged whether or not telemetry is on.
+logger = logging.getLogger(__name__)
+
+
+def corpus_version(vector_store, libraries=()):
+    """Version stamp of everything a question is answered against"""
+    parts = [vector_store.version if vector_store is not None else "-"]
+    parts.extend(library.version for library in libraries)
+    return "|".join(parts)
+
+
+def vector_chunks(query_vector, vector_store, libraries=(), k=5):
+    """Top-k chunks by embedding distance across the session's own store and the shared libraries"""
+    scored = []
+    with TELEMETRY.span("search.vector", k=k):
+        if vector_store is not None:
+            scored.extend(vector_store.similarity_search_with_score_by_vector(query_vector, k=k))
+        for library in libraries:
+            scored.extend(library.similarity_search_with_score_by_vector(query_vector, k=k))
+    scored.sort(key=lambda pair: pair[1])
+    return [chunk for chunk, _ in scored[:k]]
+
+
+def lexical_chunks(user_query, vector_store, libraries=(), k=5):
+    """Top-k chunks by BM25 across the session's own store and the shared libraries"""
+    scored = []
+    with TELEMETRY.span("search.lexical", k=k):
+        if vector_store is not None:
+            scored.extend(vector_store.lexical_search(user_query, k=k))
+        for library in libraries:
+            scored.extend(library.lexical_search(user_query, k=k))
+    scored.sort(key=lambda pair: pair[1], reverse=True)
+    return [chunk for chunk, _ in scored[:k]]
+
+
+def search_chunks(user_query, query_vector, vector_store, libraries=(), k=5):
+    """Top-k chunks from fusing the vector and BM25 rankings"""
+    return reciprocal_rank_fusion([
+        vector_chunks(query_vector, vector_store, libraries, k=HYBRID_CANDIDATES),
+        lexical_chunks(user_query, vector_store, libraries, k=HYBRID_CANDIDATES),
+    ], k=k)
+
+
+def assemble_context(user_query, query_vector, candidates, embeddings, vector_store=None, libraries=()):
+    """Diverse, trimmed subset of the retrieved chunks that fits the context token budget.
+
+    Returns (chosen chunks, their excerpts). Chunk vectors come from the
+    embedding cache, where ingestion left them, when ``embeddings`` has
+    one; chunks the cache does not hold have theirs read back from the
+    index that returned them. Only if a vector cannot be found either way
+    do the chunks keep their retrieval order.
+    """
+    vectors = None
+    if query_vector is not None and candidates:
+        cached_documents = getattr(embeddings, "cached_documents", None)
+        if cached_documents is not None:
+            vectors = cached_documents([chunk.page_content for chunk in candidates])
+        else:
+            vectors = [None] * len(candidates)
+        sources = ([vector_store] if vector_store is not None else []) + list(libraries)
+        for source in sources:
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            if not missing:
+                break
+            for i, vector in zip(missing, source.stored_vectors([candidates[i] for i in missing])):
+                vectors[i] = vector
+        if any(vector is None for vector in vectors):
+            vectors = None
+    return build_context(
+        user_query, candidates, query_vector, vectors,
+        budget=CONTEXT_TOKEN_BUDGET,
+        max_chunks=CONTEXT_MAX_CHUNKS,
+        diversity=CONTEXT_DIVERSITY,
+        window=CONTEXT_SENTENCE_WINDOW
+    )
+
+
+def build_prompt(user_query, excerpts):
+    """Prompt asking the LLM to answer from the assembled context excerpts"""
+    context = "\n\n".join(excerpts)
+
+    return f"""You are my assistant tutor.
+    Answer the question based on the following context.
+    If you cannot answer based on the context, simply say "I don't know Manavendra".
+
+    Context: {context}
+    Question: {user_query}
+
+    Answer:"""
+
+
+def format_sources(matching_chunks):
+    """Source previews shown under an answer"""
+    return [{
+        "content": chunk.page_content[:200] + "..." if len(chunk.page_content) > 200 else chunk.page_content,
+        "metadata": chunk.metadata,
+    } for chunk in matching_chunks]
+
+
+def stream_answer(user_query, vector_store, libraries, embeddings, llm, cache, result=None, streaming=True):
+    """Answer a question, yielding the answer as it is generated.
+
+    Once the generator is exhausted, ``result`` holds the full ``answer``, its
+    ``sources``, ``time_to_first_token`` and ``retrieval_time`` (None for a
+    cached answer) in seconds, and the estimated ``prompt_tokens``.
+    Keyword-like queries that BM25 can answer are served without embedding
+    the question.
+    """
+    result = result if result is not None else {}
+    started = time.perf_counter()
+    result.update({"answer": "", "sources": [], "time_to_first_token": None, "retrieval_time": None,
+                   "prompt_tokens": 0})
+    telemetry = TELEMETRY
+
+    def emit(text):
+        if result["time_to_first_token"] is None:
+            result["time_to_first_token"] = time.perf_counter() - started
+        result["answer"] += text
+        return text
+
+    outcome = "answered"
+    try:
+        version = corpus_version(vector_store, libraries)
+
+        query_vector = None
+        matching_chunks = []
+        cached = cache.lookup_text(user_query, version)
+        if cached is None and is_keyword_query(user_query):
+            matching_chunks = lexical_chunks(user_query, vector_store, libraries, k=CONTEXT_CANDIDATES)
+        if cached is None and not matching_chunks:
+            with telemetry.span("answer.embed_query"):
+                query_vector = embeddings.embed_query(user_query)
+            with telemetry.span("answer.cache_lookup"):
+                cached = cache.lookup(query_vector, version)
+        if cached is None:
+            future, leader = cache.join_or_lead(user_query, version)
+            if not leader:
+                with telemetry.span("answer.wait_for_leader"):
+                    cached = future.result()
+        if cached is not None:
+            cache.hits += 1
+            telemetry.count("answer.cache_hits")
+            outcome = "cached"
+            answer, result["sources"] = cached
+            yield emit(answer)
+            return
+
+        cache.misses += 1
+        telemetry.count("answer.cache_misses")
+        try:
+            if not matching_chunks:
+                with telemetry.span("answer.retrieve"):
+                    matching_chunks = search_chunks(user_query, query_vector, vector_store, libraries,
+                                                    k=CONTEXT_CANDIDATES)
+            result["retrieval_time"] = time.perf_counter() - started
+            if not matching_chunks:
+                yield emit("I don't know Manavendra")
+            else:
+                with telemetry.span("answer.context", candidates=len(matching_chunks)) as span:
+                    matching_chunks, excerpts = assemble_context(user_query, query_vector, matching_chunks,
+                                                                 embeddings, vector_store, libraries)
+                    prompt = build_prompt(user_query, excerpts)
+                    result["prompt_tokens"] = estimate_tokens(prompt)
+                    span.set(chunks=len(matching_chunks), prompt_tokens=result["prompt_tokens"])
+                logger.info("Answer prompt: %d estimated tokens from %d chunks",
+                            result["prompt_tokens"], len(matching_chunks))
+                result["sources"] = format_sources(matching_chunks)
+                responses = llm.stream(prompt) if streaming else [llm.invoke(prompt)]
+                usage = {}
+                for chunk in telemetry.timed("answer.llm", responses, streaming=streaming):
+                    for key, value in (getattr(chunk, "usage_metadata", None) or {}).items():
+                        usage[key] = usage.get(key, 0) + value
+                    text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                    if isinstance(text, str) and text:
+                        yield emit(text)
+                # Providers that report no usage get the usual ~4 characters per token estimate.
+                telemetry.count("llm.input_tokens", usage.get("input_tokens") or result["prompt_tokens"])
+                telemetry.count("llm.output_tokens", usage.get("output_tokens") or len(result["answer"]) // 4)
+        except BaseException as e:
+            cache.fail(user_query, version, e)
+            raise
+        cache.finish(user_query, query_vector, version, result["answer"], result["sources"])
+
+    except Exception as e:
+        outcome = "error"
+        telemetry.count("answer.errors")
+        result["sources"] = []
+        yield emit(f"Sorry, I encountered an error: {str(e)}")
+    finally:
+        # Wall time as the user sees it, including rendering between streamed pieces.
+        telemetry.record("answer.total", time.perf_counter() - started, outcome=outcome,
+                         time_to_first_token=result["time_to_first_token"], prompt_tokens=result["prompt_tokens"])
+        telemetry.flush()
@@ -0,0 +1,473 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from library import current_rss
+
+
+# =========================
+# 🔹 Synthetic Inputs
+# =========================
+# Fixtures are built from a fixed vocabulary so runs with the same seed
+# produce the same documents, chunks and queries.
+WORDS = (
+    "index vector query cache shard replica latency throughput buffer segment token embedding "
+    "cluster partition schema record column batch stream window offset commit snapshot policy "
+    "document section page chapter summary author review release deploy config server client "
+    "network request response timeout retry backoff quota budget metric counter gauge trace "
+    "span sample export report dashboard alert incident owner service module package version "
+    "memory storage disk file archive upload parser extractor splitter chunk overlap boundary "
+    "search ranking score fusion keyword phrase term posting lexicon corpus library tenant user"
+).split()
+FILLERS = "the a of to in for with on by from and or is are was be as at that this it".split()
+
+
+def _sentence(rng, words=14):
+    picked = [rng.choice(WORDS) if rng.random() < 0.6 else rng.choice(FILLERS) for _ in range(words)]
+    return " ".join(picked).capitalize() + "."
+
+
+def _paragraph(rng, sentences=5):
+    return " ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(sentences))
+
+
+def _lines(text, width=90):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def synthetic_pdf(path, pages, rng, lines_per_page=45):
+    """Write a text-only PDF with ``pages`` pages of generated prose"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for _ in range(pages):
+        lines = []
+        while len(lines) < lines_per_page:
+            lines.extend(_lines(_paragraph(rng)))
+        text = " Tj T* ".join(f"({line})" for line in lines[:lines_per_page])
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td {text} Tj ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects)))
+        page_refs.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(page_refs), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def synthetic_notion_zip(path, pages, rng):
+    """Write a Notion-style export: markdown pages in nested folders plus database CSVs"""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i in range(pages):
+            page_id = "%032x" % rng.getrandbits(128)
+            folder = f"Workspace {i % 7}" + ("" if i % 3 else f"/Project {i % 5}")
+            body = [f"# {_sentence(rng, 4)[:-1]}", ""]
+            for _ in range(rng.randint(3, 8)):
+                body.append(f"## {_sentence(rng, 3)[:-1]}")
+                body.append(_paragraph(rng).replace(" index ", " **index** ", 1))
+                body.extend(f"- {_sentence(rng, 6)}" for _ in range(rng.randint(0, 4)))
+                body.append("")
+            archive.writestr(f"Export/{folder}/Page {i} {page_id}.md", "\n".join(body))
+            if i % 25 == 0:
+                rows = ["Name,Status,Owner,Notes"]
+                rows.extend(f"{rng.choice(WORDS)} {j},{rng.choice(['Done', 'Open'])},{rng.choice(WORDS)},"
+                            f"\"{_sentence(rng, 10)}\"" for j in range(40))
+                archive.writestr(f"Export/{folder}/Tasks {page_id}.csv", "\n".join(rows))
+
+
+def synthetic_wiki_page(rng, sections=12):
+    """MediaWiki-like page with navigation, edit links and scripts around the content"""
+    body = []
+    for _ in range(sections):
+        heading = _sentence(rng, 3)[:-1]
+        body.append(f'<h2><span class="mw-headline">{heading}</span>'
+                    f'<span class="mw-editsection">[<a href="/w/index.php?action=edit">edit</a>]</span></h2>')
+        body.extend(f"<p>{_paragraph(rng)} <a href=\"/wiki/{rng.choice(WORDS)}\">{rng.choice(WORDS)}</a>.</p>"
+                    for _ in range(rng.randint(2, 4)))
+        body.append("<ul>" + "".join(f"<li>{_sentence(rng, 6)}</li>" for _ in range(3)) + "</ul>")
+    navigation = "".join(f'<li><a href="/wiki/{word}">{word}</a></li>' for word in WORDS[:60])
+    return (
+        "<!DOCTYPE html><html><head><title>Synthetic</title>"
+        + "<script>var config = {};</script>" * 5 + "<style>.x{color:red}</style></head><body>"
+        + f'<div id="mw-navigation"><nav><ul>{navigation}</ul></nav></div>'
+        + '<div id="content"><h1 id="firstHeading">Synthetic page</h1>'
+        + f'<div id="mw-content-text"><div class="mw-parser-output">{"".join(body)}</div></div></div>'
+        + f"<footer><ul>{navigation}</ul></footer></body></html>"
+    ).encode("utf-8")
+
+
+def synthetic_queries(rng, count):
+    """Mix of keyword lookups and natural-language questions over the vocabulary"""
+    queries = []
+    for i in range(count):
+        if i % 3 == 0:
+            queries.append(" ".join(rng.sample(WORDS, 2)))
+        else:
+            queries.append(f"How does the {rng.choice(WORDS)} {rng.choice(WORDS)} affect {rng.choice(WORDS)}?")
+    return queries
+
+
+# =========================
+# 🔹 Stage Measurement
+# =========================
+class Stage:
+    """Wall time, per-item latencies and peak RSS of one benchmark stage.
+
+    Used as a context manager; RSS is sampled on a background thread every
+    ``interval`` seconds while the stage runs.
+    """
+
+    def __init__(self, name, unit, latency_unit=None, interval=0.005):
+        self.name = name
+        self.unit = unit
+        self.latency_unit = latency_unit or unit
+        self.interval = interval
+        self.latencies = []
+        self.items = 0
+        self.bytes = 0
+        self.wall = 0.0
+        self.peak_rss = 0
+        self._done = threading.Event()
+
+    def _measure(self):
+        # current_rss() is None without /proc; the stage then reports no peak.
+        self.peak_rss = max(self.peak_rss, current_rss() or 0)
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self._measure()
+
+    def __enter__(self):
+        self._measure()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self._started
+        self._done.set()
+        self._sampler.join()
+        self._measure()
+
+    def record(self, seconds, items=1, nbytes=0):
+        self.latencies.append(seconds)
+        self.items += items
+        self.bytes += nbytes
+
+    def timed(self, iterable, size=None):
+        """Pass items through, recording the time spent producing each one"""
+        started = time.perf_counter()
+        for item in iterable:
+            self.record(time.perf_counter() - started, nbytes=size(item) if size else 0)
+            yield item
+            started = time.perf_counter()
+
+    def summary(self):
+        latencies = np.asarray(self.latencies or [0.0]) * 1000
+        return {
+            "stage": self.name,
+            "unit": self.unit,
+            "latency_per": self.latency_unit,
+            "items": self.items,
+            "wall_seconds": round(self.wall, 4),
+            "throughput_per_s": round(self.items / self.wall, 2) if self.wall else None,
+            "mb_per_s": round(self.bytes / 1e6 / self.wall, 3) if self.wall and self.bytes else None,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            "peak_rss_mb": round(self.peak_rss / 1e6, 1) if self.peak_rss else None,
+        }
+
+
+class TimedEmbeddings(Embeddings):
+    """Embeddings wrapper recording each request's latency in a stage"""
+
+    def __init__(self, underlying, stage):
+        self.underlying = underlying
+        self.stage = stage
+
+    def embed_documents(self, texts):
+        started = time.perf_counter()
+        vectors = self.underlying.embed_documents(texts)
+        self.stage.record(time.perf_counter() - started, len(texts), sum(len(text) for text in texts))
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        started = time.perf_counter()
+        vectors = await self.underlying.aembed_documents(texts)
+        self.stage.record(time.perf_counter() - started, len(texts), sum(len(text) for text in texts))
+        return vectors
+
+
+# =========================
+# 🔹 Pipeline Stages
+# =========================
+def _text_size(piece):
+    return len(piece[1].encode("utf-8"))
+
+
+def extract_pdfs(paths, executor, stage):
+    """(document key, text, metadata) pieces of every page, as the app builds them"""
+    from pdf_extraction import iter_pdf_pages
+    files = [open(path, "rb") for path in paths]
+    try:
+        pages = ((os.path.basename(paths[i]), text, {"source_file": os.path.basename(paths[i]), "page_number": n})
+                 for i, n, text in iter_pdf_pages(files, executor) if n is not None)
+        return list(stage.timed(pages, _text_size))
+    finally:
+        for file in files:
+            file.close()
+
+
+def extract_notion(paths, executor, stage):
+    from notion_export import iter_notion_pages
+    pieces = []
+    for path in paths:
+        with open(path, "rb") as file:
+            pages = ((member, text, {"source_file": os.path.basename(path), "page_title": title, "page_path": page_path})
+                     for member, title, page_path, text in iter_notion_pages(file, executor))
+            pieces.extend(stage.timed(pages, _text_size))
+    return pieces
+
+
+def extract_html(pages, stage):
+    from html_extraction import extract_sections
+    pieces = []
+    for i, body in enumerate(pages):
+        started = time.perf_counter()
+        sections = extract_sections(body)
+        stage.record(time.perf_counter() - started, nbytes=len(body))
+        url = f"https://wiki.example/wiki/Page_{i}"
+        for heading, text in sections:
+            metadata = {"source_file": url, "url": url}
+            if heading:
+                metadata["section"] = heading
+                text = f"{heading}\n{text}"
+            pieces.append((url, text + "\n\n", metadata))
+    return pieces
+
+
+def embed_all(embeddings, chunks, batch_size, concurrency):
+    """(batch, vectors) for every micro-batch, embedded the way the app does"""
+    from embedding_pipeline import embed_stream
+    batches = []
+    asyncio.run(embed_stream(embeddings, chunks, lambda batch, vectors: batches.append((batch, vectors)),
+                             batch_size=batch_size, max_concurrency=concurrency))
+    return batches
+
+
+def grow_index(vector_store, target, texts, vectors, rng):
+    """Pad the index to ``target`` vectors with jittered copies of the ingested chunks"""
+    noise = np.random.default_rng(rng.getrandbits(32))
+    while len(vector_store.index_to_docstore_id) < target:
+        count = min(10_000, target - len(vector_store.index_to_docstore_id))
+        picked = noise.integers(0, len(texts), count)
+        jittered = vectors[picked] + noise.normal(0, 0.02, (count, vectors.shape[1])).astype(np.float32)
+        jittered /= np.linalg.norm(jittered, axis=1, keepdims=True)
+        vector_store.add_embeddings([(texts[i], vector) for i, vector in zip(picked, jittered)],
+                                    metadatas=[{"doc_id": "filler"} for _ in range(count)])
+
+
+def prompt_summary(index_size, tokens):
+    """Estimated prompt tokens of the answers generated at one index size"""
+    tokens = np.asarray(tokens or [0])
+    return {
+        "index_size": index_size,
+        "mean": round(float(tokens.mean()), 1),
+        "p50": round(float(np.percentile(tokens, 50)), 1),
+        "p95": round(float(np.percentile(tokens, 95)), 1),
+    }
+
+
+# =========================
+# 🔹 Benchmark Runner
+# =========================
+def run_benchmark(args, fixtures):
+    """Generate inputs in ``fixtures``, run every stage and return the report"""
+    from answer_cache import AnswerCache
+    from answering import stream_answer
+    from embedding_pipeline import append_to_faiss
+    from index_tiering import TierPolicy
+    from ingestion import split_stream
+    from near_duplicates import Deduplicator
+    from providers import create_chat_model, create_embeddings
+    rng = random.Random(args.seed)
+    stages = []
+
+    def stage(name, unit, latency_unit=None):
+        stages.append(Stage(name, unit, latency_unit))
+        return stages[-1]
+
+    pdfs = [os.path.join(fixtures, f"doc{i}.pdf") for i in range(args.pdf_files)]
+    for path in pdfs:
+        synthetic_pdf(path, args.pdf_pages, rng)
+    zips = [os.path.join(fixtures, f"notion{i}.zip") for i in range(args.notion_zips)]
+    for path in zips:
+        synthetic_notion_zip(path, args.notion_pages, rng)
+    html = [synthetic_wiki_page(rng, args.html_sections) for _ in range(args.html_pages)]
+
+    executor = None
+    if args.workers:
+        from pdf_extraction import create_extraction_pool
+        executor = create_extraction_pool(args.workers)
+    try:
+        sources = []
+        if pdfs:
+            with stage("extract/pdf", "page") as s:
+                sources.append(("pdf", extract_pdfs(pdfs, executor, s)))
+        if zips:
+            with stage("extract/notion", "page") as s:
+                sources.append(("notion", extract_notion(zips, executor, s)))
+        if html:
+            with stage("extract/html", "page") as s:
+                sources.append(("html", extract_html(html, s)))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    chunks = []
+    for kind, pieces in sources:
+        with stage(f"split/{kind}", "chunk") as s:
+            for chunk in s.timed(split_stream(iter(pieces), args.window_chars), len):
+                chunk.metadata["doc_id"] = f"{kind}:{chunk.metadata['source_file']}"
+                chunks.append(chunk)
+
+    with stage("deduplicate", "chunk") as s:
+        deduplicator = Deduplicator(None)
+        chunks = list(s.timed(deduplicator.filter(chunks), lambda c: len(c.page_content)))
+
+    embeddings = create_embeddings("offline", f"offline/hashing-{args.dim}", latency=args.embed_latency_ms / 1000)
+    with stage("embed", "chunk", "request") as s:
+        batches = embed_all(TimedEmbeddings(embeddings, s), chunks, args.batch_size, args.concurrency)
+
+    vector_store = None
+    with stage("index", "chunk", "batch") as s:
+        for batch, vectors in batches:
+            started = time.perf_counter()
+            vector_store, _ = append_to_faiss(vector_store, embeddings, batch, vectors)
+            s.record(time.perf_counter() - started, len(batch), sum(len(doc.page_content) for doc in batch))
+    if vector_store is None:
+        raise SystemExit("No chunks were produced; increase the fixture sizes.")
+
+    llm = create_chat_model("offline", "offline/echo", latency=args.llm_latency_ms / 1000)
+    cache = AnswerCache()
+    policy = TierPolicy(threshold=args.tier_threshold, kind=args.tier)
+    queries = synthetic_queries(rng, args.queries)
+    texts = [doc.page_content for batch, _ in batches for doc in batch]
+    vectors = np.asarray([vector for _, batch_vectors in batches for vector in batch_vectors], dtype=np.float32)
+    prompt_tokens = []
+    for scale in sorted(args.scales):
+        grow_index(vector_store, scale, texts, vectors, rng)
+        vector_store.apply_tier_policy(policy)
+        size = len(vector_store.index_to_docstore_id)
+        retrieval, answering = stage(f"retrieve@{size}", "query"), stage(f"answer@{size}", "query")
+        tokens = []
+        with retrieval, answering:
+            for query in queries:
+                # The app's own answering path: answer cache, keyword fast path, MMR and token budget.
+                result = {}
+                started = time.perf_counter()
+                for _ in stream_answer(query, vector_store, (), embeddings, llm, cache, result, streaming=False):
+                    pass
+                if result["retrieval_time"] is not None:
+                    retrieval.record(result["retrieval_time"])
+                if result["prompt_tokens"]:
+                    tokens.append(result["prompt_tokens"])
+                answering.record(time.perf_counter() - started)
+        prompt_tokens.append(prompt_summary(size, tokens))
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "html_parser": __import__("html_extraction").parser_backend(),
+            "chunks": len(chunks),
+            "duplicates_skipped": deduplicator.skipped,
+            "answer_cache_hits": cache.hits,
+            "args": {key: value for key, value in vars(args).items() if key not in ("json", "fixtures")},
+        },
+        "stages": [s.summary() for s in stages],
+        "prompt_tokens": prompt_tokens,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IQBot's ingestion and question answering on synthetic inputs")
+    parser.add_argument("--pdf-files", type=int, default=2, help="synthetic PDFs to ingest")
+    parser.add_argument("--pdf-pages", type=int, default=50, help="pages per PDF")
+    parser.add_argument("--notion-zips", type=int, default=1, help="synthetic Notion exports to ingest")
+    parser.add_argument("--notion-pages", type=int, default=200, help="pages per Notion export")
+    parser.add_argument("--html-pages", type=int, default=50, help="synthetic wiki pages to ingest")
+    parser.add_argument("--html-sections", type=int, default=12, help="sections per wiki page")
+    parser.add_argument("--workers", type=int, default=0, help="extraction processes (0 extracts inline)")
+    parser.add_argument("--window-chars", type=int, default=64_000, help="streaming splitter window")
+    parser.add_argument("--dim", type=int, default=768, help="embedding dimension")
+    parser.add_argument("--batch-size", type=int, default=100, help="chunks per embedding request")
+    parser.add_argument("--concurrency", type=int, default=4, help="embedding requests in flight")
+    parser.add_argument("--embed-latency-ms", type=float, default=0, help="simulated latency per embedding request")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="simulated latency per answer")
+    parser.add_argument("--scales", type=lambda value: [int(n) for n in value.split(",")], default=[10_000],
+                        help="comma-separated index sizes to measure question answering at")
+    parser.add_argument("--tier-threshold", type=int, default=200_000, help="index size that switches to approximate search")
+    parser.add_argument("--tier", choices=("ivf", "hnsw"), default="ivf", help="approximate index type")
+    parser.add_argument("--queries", type=int, default=200, help="questions asked at each index size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fixtures", help="keep the generated inputs in this directory")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    fixtures = args.fixtures or tempfile.mkdtemp(prefix="iqbot-bench-")
+    os.makedirs(fixtures, exist_ok=True)
+    try:
+        report = run_benchmark(args, fixtures)
+    finally:
+        if not args.fixtures:
+            shutil.rmtree(fixtures, ignore_errors=True)
+
+    print(f"{'stage':<18} {'items':>8} {'per s':>10} {'MB/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+    for row in report["stages"]:
+        print(f"{row['stage']:<18} {row['items']:>8} {row['throughput_per_s'] or 0:>10.1f} {row['mb_per_s'] or 0:>8.2f} "
+              f"{row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} {row['p99_ms']:>9.3f} {row['peak_rss_mb'] or 0:>8.1f}")
+    for row in report["prompt_tokens"]:
+        print(f"prompt tokens @{row['index_size']}: mean {row['mean']:.0f}, p50 {row['p50']:.0f}, p95 {row['p95']:.0f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
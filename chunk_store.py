@@ -0,0 +1,264 @@
+import bisect
+import json
+import mmap
+import os
+from array import array
+from collections.abc import Mapping
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+# =========================
+# 🔹 Compact Chunk Store
+# =========================
+# Chunk texts and metadata, addressed by FAISS integer ID, without a Python
+# object per chunk. Rows sit in two segments:
+#
+#   base   frozen numpy arrays, memory-mapped when loaded from disk
+#   tail   rows added since, in growable arrays
+#
+# Each segment holds the IDs (ascending), int64 byte offsets into one UTF-8
+# text buffer and an int32 code per metadata key and row. Codes index a
+# value table shared by all rows (-1 means the key is absent), so repeated
+# values such as file names are stored once. Removed rows are remembered
+# until they outnumber the live ones, then both segments are compacted into
+# a new base.
+#
+# On disk (``save``) a store is a directory of:
+#
+#   meta.json          metadata keys, value table and next ID
+#   ids.npy            int64 chunk IDs, ascending
+#   text.bin           UTF-8 chunk texts back to back
+#   text_offsets.npy   int64 byte offsets into text.bin (n + 1 entries)
+#   meta.npy           int32 value codes, one row per chunk, one column per key
+COMPACT_MIN_DEAD = 1024
+
+
+def _map_text(path, size):
+    with open(path, "rb") as f:
+        # mmap refuses empty files; an empty store has nothing to read anyway.
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+
+class ChunkStore:
+    """Chunk texts and metadata in flat arrays, addressed by FAISS integer ID.
+
+    Doubles as the ``docstore`` of a LangChain FAISS store: ``search``
+    builds a Document for a docstore ID (the FAISS ID as a string) on
+    demand, and ``id_map`` is the matching ``index_to_docstore_id``.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._values = []
+        self._codes = {}
+        self.next_id = 0
+        self._base_ids = np.zeros(0, dtype=np.int64)
+        self._base_offsets = np.zeros(1, dtype=np.int64)
+        self._base_text = b""
+        self._base_meta = np.zeros((0, 0), dtype=np.int32)
+        self._base_keys = []
+        self._reset_tail()
+        self._dead = set()
+        self.id_map = ChunkIds(self)
+
+    def _reset_tail(self):
+        self._tail_ids = array("q")
+        self._tail_offsets = array("q", [0])
+        self._tail_text = bytearray()
+        self._tail_meta = {}
+
+    def __len__(self):
+        return len(self._base_ids) + len(self._tail_ids) - len(self._dead)
+
+    def __contains__(self, faiss_id):
+        return self._locate(int(faiss_id)) is not None
+
+    def _locate(self, faiss_id):
+        """(in base, row) of a live chunk, or None"""
+        if faiss_id in self._dead:
+            return None
+        tail = self._tail_ids
+        if tail and faiss_id >= tail[0]:
+            row = bisect.bisect_left(tail, faiss_id)
+            return (False, row) if row < len(tail) and tail[row] == faiss_id else None
+        row = int(np.searchsorted(self._base_ids, faiss_id))
+        return (True, row) if row < len(self._base_ids) and self._base_ids[row] == faiss_id else None
+
+    def ids(self):
+        """Live chunk IDs in ascending order"""
+        dead = self._dead
+        for faiss_id in self._base_ids.tolist():
+            if faiss_id not in dead:
+                yield faiss_id
+        for faiss_id in self._tail_ids:
+            if faiss_id not in dead:
+                yield faiss_id
+
+    def _code(self, value):
+        key = json.dumps(value, sort_keys=True)
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self._values)
+            self._values.append(value)
+        return code
+
+    def add(self, faiss_ids, texts, metadatas):
+        """Append chunks; IDs must be ascending and above every ID seen so far"""
+        for metadata in metadatas:
+            for key in metadata:
+                if key not in self._tail_meta:
+                    self._tail_meta[key] = array("i", [-1]) * len(self._tail_ids)
+                    if key not in self._keys:
+                        self._keys.append(key)
+        for faiss_id, text, metadata in zip(faiss_ids, texts, metadatas):
+            if faiss_id < self.next_id:
+                raise ValueError(f"Chunk ID {faiss_id} is not above the last one ({self.next_id - 1})")
+            self.next_id = faiss_id + 1
+            self._tail_ids.append(faiss_id)
+            self._tail_text += text.encode("utf-8")
+            self._tail_offsets.append(len(self._tail_text))
+            for key, column in self._tail_meta.items():
+                column.append(self._code(metadata[key]) if key in metadata else -1)
+
+    def remove(self, faiss_ids):
+        """Drop chunks; IDs that are not stored are ignored"""
+        self._dead.update(faiss_id for faiss_id in map(int, faiss_ids) if self._locate(faiss_id) is not None)
+        if len(self._dead) >= COMPACT_MIN_DEAD and len(self._dead) > len(self):
+            self.compact()
+
+    def text(self, faiss_id):
+        """Text of a live chunk"""
+        in_base, row = self._located(faiss_id)
+        if in_base:
+            start, end = self._base_offsets[row], self._base_offsets[row + 1]
+            return bytes(self._base_text[start:end]).decode("utf-8")
+        return self._tail_text[self._tail_offsets[row]:self._tail_offsets[row + 1]].decode("utf-8")
+
+    def value(self, faiss_id, key, default=None):
+        """One metadata value of a live chunk, without building its whole metadata"""
+        in_base, row = self._located(faiss_id)
+        if in_base:
+            code = self._base_meta[row, self._base_keys.index(key)] if key in self._base_keys else -1
+        else:
+            code = self._tail_meta[key][row] if key in self._tail_meta else -1
+        return default if code < 0 else self._values[code]
+
+    def metadata(self, faiss_id):
+        """Metadata of a live chunk as a new dict"""
+        in_base, row = self._located(faiss_id)
+        if in_base:
+            codes = zip(self._base_keys, self._base_meta[row].tolist())
+        else:
+            codes = ((key, column[row]) for key, column in self._tail_meta.items())
+        return {key: self._values[code] for key, code in codes if code >= 0}
+
+    def document(self, faiss_id):
+        """A live chunk as a Document whose ID is its docstore ID"""
+        faiss_id = int(faiss_id)
+        return Document(id=str(faiss_id), page_content=self.text(faiss_id), metadata=self.metadata(faiss_id))
+
+    def _located(self, faiss_id):
+        location = self._locate(int(faiss_id))
+        if location is None:
+            raise KeyError(faiss_id)
+        return location
+
+    def search(self, search):
+        """Docstore lookup by docstore ID, as LangChain's FAISS store does it"""
+        try:
+            return self.document(int(search))
+        except (KeyError, ValueError):
+            return f"ID {search} not found."
+
+    def _live_columns(self):
+        """(ids, text offsets, text, metadata codes) of the live rows, as new arrays"""
+        keys = self._keys
+        ids, pieces, rows = [], [], []
+        base_columns = [self._base_keys.index(key) if key in self._base_keys else None for key in keys]
+        for row, faiss_id in enumerate(self._base_ids.tolist()):
+            if faiss_id in self._dead:
+                continue
+            ids.append(faiss_id)
+            pieces.append(bytes(self._base_text[self._base_offsets[row]:self._base_offsets[row + 1]]))
+            codes = self._base_meta[row]
+            rows.append([-1 if column is None else int(codes[column]) for column in base_columns])
+        tail_columns = [self._tail_meta.get(key) for key in keys]
+        for row, faiss_id in enumerate(self._tail_ids):
+            if faiss_id in self._dead:
+                continue
+            ids.append(faiss_id)
+            pieces.append(bytes(self._tail_text[self._tail_offsets[row]:self._tail_offsets[row + 1]]))
+            rows.append([-1 if column is None else column[row] for column in tail_columns])
+        offsets = np.zeros(len(pieces) + 1, dtype=np.int64)
+        np.cumsum([len(piece) for piece in pieces], out=offsets[1:])
+        meta = np.array(rows, dtype=np.int32).reshape(len(ids), len(keys))
+        return np.array(ids, dtype=np.int64), offsets, b"".join(pieces), meta
+
+    def compact(self):
+        """Rewrite the live rows of both segments as a new in-memory base"""
+        self._base_ids, self._base_offsets, self._base_text, self._base_meta = self._live_columns()
+        self._base_keys = list(self._keys)
+        self._reset_tail()
+        self._dead = set()
+
+    def save(self, directory):
+        """Write the live rows to a store directory"""
+        ids, offsets, text, meta = self._live_columns()
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "ids.npy"), ids)
+        np.save(os.path.join(directory, "text_offsets.npy"), offsets)
+        np.save(os.path.join(directory, "meta.npy"), meta)
+        with open(os.path.join(directory, "text.bin"), "wb") as f:
+            f.write(text)
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"keys": self._keys, "values": self._values, "next_id": self.next_id}, f)
+
+    @classmethod
+    def load(cls, directory):
+        """Open a store directory, memory-mapping its arrays and text"""
+        store = cls()
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        store._keys = state["keys"]
+        store._base_keys = list(state["keys"])
+        store._values = state["values"]
+        store._codes = {json.dumps(value, sort_keys=True): code for code, value in enumerate(store._values)}
+        store.next_id = state["next_id"]
+        store._base_ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode="r")
+        store._base_offsets = np.load(os.path.join(directory, "text_offsets.npy"), mmap_mode="r")
+        store._base_meta = np.load(os.path.join(directory, "meta.npy"), mmap_mode="r")
+        store._base_text = _map_text(os.path.join(directory, "text.bin"), int(store._base_offsets[-1]))
+        return store
+
+    @classmethod
+    def from_documents(cls, documents):
+        """Store built from (FAISS ID, Document) pairs, e.g. an older InMemoryDocstore"""
+        store = cls()
+        documents = sorted(documents, key=lambda pair: pair[0])
+        store.add([faiss_id for faiss_id, _ in documents],
+                  [document.page_content for _, document in documents],
+                  [document.metadata for _, document in documents])
+        return store
+
+
+class ChunkIds(Mapping):
+    """``index_to_docstore_id`` view of a ChunkStore: FAISS ID to docstore ID"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, faiss_id):
+        if faiss_id not in self.store:
+            raise KeyError(faiss_id)
+        return str(int(faiss_id))
+
+    def __contains__(self, faiss_id):
+        return faiss_id in self.store
+
+    def __iter__(self):
+        return self.store.ids()
+
+    def __len__(self):
+        return len(self.store)
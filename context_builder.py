@@ -0,0 +1,122 @@
+import re
+
+import numpy as np
+
+from lexical_index import QUESTION_WORDS, tokenize
+
+
+# =========================
+# 🔹 Context Assembly
+# =========================
+# Retrieved chunks are re-ranked for diversity, cut down to the sentences
+# around query terms and packed into a token budget before they reach the
+# prompt, so overlapping or redundant chunks do not inflate it.
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+STOP_WORDS = QUESTION_WORDS | {
+    "the", "and", "for", "with", "that", "this", "from", "into", "about", "there", "their", "than",
+    "then", "them", "they", "have", "has", "was", "were", "been", "not", "but", "you", "your",
+}
+
+
+def estimate_tokens(text):
+    """Rough token count at ~4 characters per token, the usual estimate for English"""
+    return (len(text) + 3) // 4
+
+
+def query_terms(query):
+    """Terms of a query that are worth finding in a sentence"""
+    return {term for term in tokenize(query) if len(term) > 2 and term not in STOP_WORDS}
+
+
+def mmr(query_vector, vectors, k, diversity=0.3):
+    """Indices of up to k vectors by maximal marginal relevance, in pick order.
+
+    Each pick maximises ``(1 - diversity) * sim(query) - diversity *
+    max sim(already picked)`` under cosine similarity, so a chunk that
+    mostly repeats one already chosen loses to a less similar one.
+    """
+    if not len(vectors) or k <= 0:
+        return []
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_vector, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    relevance = matrix @ query
+    redundancy = np.full(len(matrix), -np.inf)
+    picked = []
+    remaining = np.ones(len(matrix), dtype=bool)
+    while len(picked) < min(k, len(matrix)):
+        penalty = np.where(np.isinf(redundancy), 0.0, redundancy)
+        scores = np.where(remaining, (1 - diversity) * relevance - diversity * penalty, -np.inf)
+        best = int(np.argmax(scores))
+        picked.append(best)
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, matrix @ matrix[best])
+    return picked
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+
+def sentence_window(sentences, terms, window=1):
+    """Indices of the sentences that mention a query term, plus ``window`` neighbours each side.
+
+    A chunk with no term in it (a purely semantic match) is kept whole.
+    """
+    hits = [i for i, sentence in enumerate(sentences) if terms & set(tokenize(sentence))]
+    if not hits:
+        return list(range(len(sentences)))
+    keep = set()
+    for i in hits:
+        keep.update(range(max(0, i - window), min(len(sentences), i + window + 1)))
+    return sorted(keep)
+
+
+def build_context(query, candidates, query_vector=None, vectors=None, budget=800, max_chunks=8,
+                  diversity=0.3, window=1):
+    """Choose, trim and pack retrieved chunks into a context of at most ``budget`` tokens.
+
+    ``candidates`` are Documents in retrieval order and ``vectors`` their
+    embeddings; with a query vector they are re-ranked by MMR, otherwise
+    retrieval order is kept. Each chunk is reduced to sentence windows
+    around the query terms, sentences already taken from an overlapping
+    chunk are dropped, and chunks are added until the budget is spent.
+    Returns (chosen Documents, their excerpts).
+    """
+    if query_vector is not None and vectors is not None and len(candidates):
+        order = mmr(query_vector, vectors, len(candidates), diversity)
+    else:
+        order = range(len(candidates))
+    terms = query_terms(query)
+    seen = set()
+    chosen, excerpts = [], []
+    spent = 0
+    for i in order:
+        if len(chosen) >= max_chunks:
+            break
+        sentences = split_sentences(candidates[i].page_content)
+        pieces, previous = [], None
+        for j in sentence_window(sentences, terms, window):
+            key = " ".join(sentences[j].lower().split())
+            if key in seen:
+                continue
+            seen.add(key)
+            if previous is not None and j != previous + 1:
+                pieces.append("…")
+            pieces.append(sentences[j])
+            previous = j
+        if not pieces:
+            continue
+        excerpt = " ".join(pieces)
+        cost = estimate_tokens(excerpt)
+        if spent + cost > budget:
+            if chosen:
+                continue
+            # Even the best chunk alone is over budget: keep as much of it as fits.
+            excerpt = excerpt[:budget * 4]
+            cost = estimate_tokens(excerpt)
+        chosen.append(candidates[i])
+        excerpts.append(excerpt)
+        spent += cost
+    return chosen, excerpts
@@ -0,0 +1,311 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from telemetry import TELEMETRY
+
+
+# =========================
+# 🔹 On-disk Embedding Cache
+# =========================
+def text_key(text):
+    """Content hash used to address a chunk in the cache"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed embedding store for a single embedding model.
+
+    Vectors live in a memory-mapped float32 matrix (``vectors.f32``) with a
+    fixed number of slots. ``index.json`` is a checkpoint of the text hash to
+    slot map in least-recently-used order, and every slot assigned since is
+    appended to a log (``index-<n>.log``), so storing a vector costs one
+    short write however big the cache is. Hits are logged the same way, so
+    the eviction order survives a restart. When every slot is taken the
+    least recently used entry is evicted and its slot reused. Once the log holds half as
+    many records as the map a background thread writes a new checkpoint and
+    starts a new log.
+    """
+
+    def __init__(self, directory, model, max_entries=100_000, compact_after=10_000):
+        safe_model = re.sub(r"[^A-Za-z0-9_.-]+", "_", model)
+        self.directory = os.path.join(directory, safe_model)
+        self.model = model
+        self.max_entries = max_entries
+        self.compact_after = compact_after
+        self.dim = None
+        self._slots = OrderedDict()
+        self._free = []
+        self._vectors = None
+        self._log = None
+        self._log_number = 0
+        self._log_records = 0
+        self._compacting = False
+        # Bumped whenever the storage is dropped or re-created, so a running
+        # compaction can tell its checkpoint no longer applies.
+        self._generation = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.directory, "vectors.f32")
+
+    def _log_path(self, number):
+        return os.path.join(self.directory, f"index-{number}.log")
+
+    def _log_numbers(self):
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = re.fullmatch(r"index-(\d+)\.log", name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _load(self):
+        if not os.path.exists(self._index_path):
+            return
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("capacity") != self.max_entries or not os.path.exists(self._vectors_path):
+                # Capacity changed or the matrix went missing: start over.
+                return
+            self.dim = meta["dim"]
+            self._slots = OrderedDict((key, slot) for key, slot in meta["entries"])
+            # Replay slots assigned after the checkpoint, oldest log first.
+            owners = {slot: key for key, slot in self._slots.items()}
+            self._log_number = meta.get("log", 0)
+            for number in self._log_numbers():
+                if number < self._log_number:
+                    continue
+                with open(self._log_path(number), "r", encoding="utf-8") as f:
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) != 2:
+                            # A write cut short by a crash.
+                            continue
+                        key, slot = parts[0], int(parts[1])
+                        previous = owners.get(slot)
+                        if previous is not None and previous != key:
+                            self._slots.pop(previous, None)
+                        self._slots.pop(key, None)
+                        self._slots[key] = slot
+                        owners[slot] = key
+                        self._log_records += 1
+                self._log_number = number
+            self._open_vectors("r+")
+            used = set(self._slots.values())
+            self._free = [slot for slot in range(self.max_entries - 1, -1, -1) if slot not in used]
+        except (OSError, ValueError, KeyError):
+            self.dim = None
+            self._slots = OrderedDict()
+            self._vectors = None
+            self._log_records = 0
+
+    def _open_vectors(self, mode):
+        self._vectors = np.memmap(
+            self._vectors_path,
+            dtype=np.float32,
+            mode=mode,
+            shape=(self.max_entries, self.dim),
+        )
+
+    def _init_storage(self, dim):
+        self._generation += 1
+        self.dim = dim
+        self._slots = OrderedDict()
+        self._free = list(range(self.max_entries - 1, -1, -1))
+        self._open_vectors("w+")
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        for number in self._log_numbers():
+            os.remove(self._log_path(number))
+        self._log_records = 0
+        # An empty checkpoint, so the new matrix is never read with an old map.
+        self._write_checkpoint([], self._log_number)
+
+    def _write_checkpoint(self, entries, log_number):
+        os.replace(self._dump_checkpoint(entries, log_number), self._index_path)
+
+    def _dump_checkpoint(self, entries, log_number):
+        """Write a checkpoint to a temporary file and return its path"""
+        meta = {
+            "model": self.model,
+            "dim": self.dim,
+            "capacity": self.max_entries,
+            "entries": entries,
+            "log": log_number,
+        }
+        # Write-then-rename so a crash never leaves a half-written index.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return tmp_path
+
+    def _append(self, records):
+        if self._log is None:
+            self._log = open(self._log_path(self._log_number), "a", encoding="utf-8")
+        self._log.write("".join(f"{key} {slot}\n" for key, slot in records))
+        # Into the OS page cache, like the vectors; no fsync on the hot path.
+        self._log.flush()
+        self._log_records += len(records)
+
+    def _compact(self):
+        """Checkpoint the slot map and drop the logs it covers; runs on a background thread"""
+        try:
+            with self._lock:
+                if self._vectors is None:
+                    return
+                entries = list(self._slots.items())
+                log_number = self._log_number + 1
+                generation = self._generation
+                if self._log is not None:
+                    self._log.close()
+                self._log = None
+                self._log_number = log_number
+                self._log_records = 0
+                self._vectors.flush()
+            tmp_path = self._dump_checkpoint(entries, log_number)
+            with self._lock:
+                if self._generation != generation:
+                    # Cleared or re-created while the checkpoint was written.
+                    os.remove(tmp_path)
+                    return
+                os.replace(tmp_path, self._index_path)
+                for number in self._log_numbers():
+                    if number < log_number:
+                        os.remove(self._log_path(number))
+        finally:
+            self._compacting = False
+
+    def get_many(self, keys):
+        """Return cached vectors for keys, None where missing"""
+        with self._lock:
+            results = []
+            hits = []
+            for key in keys:
+                slot = self._slots.get(key)
+                if slot is None:
+                    results.append(None)
+                    continue
+                self._slots.move_to_end(key)
+                results.append(np.array(self._vectors[slot]))
+                hits.append((key, slot))
+            if hits:
+                # Replaying a key at its own slot moves it to the recent end again.
+                self._append(hits)
+                self._maybe_compact()
+            return results
+
+    def put_many(self, keys, vectors):
+        """Store vectors under keys, evicting least-recently-used entries"""
+        if not keys:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self._vectors is None or self.dim != vectors.shape[1]:
+                self._init_storage(vectors.shape[1])
+            records = []
+            for key, vector in zip(keys, vectors):
+                slot = self._slots.get(key)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                    else:
+                        _, slot = self._slots.popitem(last=False)
+                    self._slots[key] = slot
+                else:
+                    self._slots.move_to_end(key)
+                self._vectors[slot] = vector
+                records.append((key, slot))
+            self._append(records)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._log_records >= max(self.compact_after, len(self._slots) // 2) and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self._compact, name="embedding-cache-compact", daemon=True).start()
+
+    def clear(self):
+        """Drop every cached vector for this model"""
+        with self._lock:
+            self._generation += 1
+            self._slots = OrderedDict()
+            self._vectors = None
+            self.dim = None
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            self._log_records = 0
+            paths = [self._index_path, self._vectors_path]
+            paths.extend(self._log_path(number) for number in self._log_numbers())
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the provider"""
+
+    def __init__(self, underlying, cache):
+        self.underlying = underlying
+        self.cache = cache
+        self.last_hits = 0
+        self.last_misses = 0
+
+    def embed_documents(self, texts):
+        keys = [text_key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # Identical chunks inside one upload are only embedded once.
+        missing = {}
+        for key, text, vector in zip(keys, texts, cached):
+            if vector is None and key not in missing:
+                missing[key] = text
+
+        if missing:
+            miss_keys = list(missing)
+            new_vectors = self.underlying.embed_documents([missing[key] for key in miss_keys])
+            self.cache.put_many(miss_keys, new_vectors)
+            fresh = dict(zip(miss_keys, new_vectors))
+            cached = [vector if vector is not None else fresh[key] for key, vector in zip(keys, cached)]
+
+        self.last_hits = len(texts) - len(missing)
+        self.last_misses = len(missing)
+        TELEMETRY.count("embed.cache_hits", self.last_hits)
+        TELEMETRY.count("embed.cache_misses", self.last_misses)
+        return [np.asarray(vector, dtype=np.float32).tolist() for vector in cached]
+
+    def cached_documents(self, texts):
+        """Cached vectors for texts, None where missing; never calls the provider"""
+        return [None if vector is None else np.asarray(vector, dtype=np.float32)
+                for vector in self.cache.get_many([text_key(text) for text in texts])]
+
+    def embed_query(self, text):
+        # Providers embed queries differently from documents, so they get their own keys.
+        key = text_key("query\0" + text)
+        cached = self.cache.get_many([key])[0]
+        if cached is not None:
+            TELEMETRY.count("embed.cache_hits")
+            return np.asarray(cached, dtype=np.float32).tolist()
+        TELEMETRY.count("embed.cache_misses")
+        vector = self.underlying.embed_query(text)
+        self.cache.put_many([key], [vector])
+        return vector
@@ -0,0 +1,159 @@
+import asyncio
+import random
+import threading
+import time
+from itertools import islice
+
+from telemetry import TELEMETRY
+from vector_index import DocumentIndex
+
+
+# =========================
+# 🔹 Rate Limiting
+# =========================
+class TokenBucket:
+    """Request pacer shared by every session that talks to the same provider.
+
+    Callers reserve a token and sleep off any debt, so the bucket is safe to
+    share between threads running separate event loops. The refill rate is
+    halved on every rate-limit response and creeps back up to ``max_rate``
+    after successful requests.
+    """
+
+    def __init__(self, requests_per_minute, burst=None, min_requests_per_minute=10):
+        self.max_rate = requests_per_minute / 60.0
+        self.min_rate = min(min_requests_per_minute, requests_per_minute) / 60.0
+        self.rate = self.max_rate
+        self.capacity = burst if burst is not None else max(1, int(self.max_rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        """Take one token and return how long the caller must wait for it"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self):
+        """Back off after the provider reported a rate limit"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+    def reward(self):
+        """Recover part of the rate after a successful request"""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+def is_rate_limit_error(error):
+    """Whether an exception is the provider's 429 / quota response"""
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "RateLimitError"):
+        return True
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "rate limit" in message
+
+
+# =========================
+# 🔹 Batched Embedding
+# =========================
+async def embed_with_retry(embeddings, texts, limiter=None, max_retries=6):
+    """Embed one batch, pacing through the limiter and retrying on 429s"""
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            queued = time.perf_counter()
+            await limiter.acquire()
+            TELEMETRY.record("embed.rate_limit_wait", time.perf_counter() - queued)
+        started = time.perf_counter()
+        try:
+            vectors = await embeddings.aembed_documents(texts)
+        except Exception as e:
+            TELEMETRY.record("embed.request", time.perf_counter() - started, texts=len(texts), error=type(e).__name__)
+            if not is_rate_limit_error(e) or attempt == max_retries:
+                raise
+            TELEMETRY.count("embed.retries")
+            if limiter is not None:
+                limiter.penalize()
+            await asyncio.sleep(min(60.0, 2 ** attempt) * (0.5 + random.random()))
+            continue
+        TELEMETRY.record("embed.request", time.perf_counter() - started, texts=len(texts))
+        if limiter is not None:
+            limiter.reward()
+        return vectors
+
+
+async def embed_stream(embeddings, documents, on_batch, batch_size=100, max_concurrency=4,
+                       limiter=None, max_retries=6):
+    """Embed an iterable of Documents in micro-batches while it is still being produced.
+
+    Batches are pulled from ``documents`` off the event loop, at most
+    ``max_concurrency`` of them are held at once, and ``on_batch(batch,
+    vectors)`` runs on the event loop as each one finishes, so completion
+    order is not input order.
+    """
+    loop = asyncio.get_event_loop()
+    iterator = iter(documents)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = set()
+    failures = []
+
+    async def run(batch):
+        try:
+            vectors = await embed_with_retry(
+                embeddings, [doc.page_content for doc in batch], limiter, max_retries
+            )
+            on_batch(batch, vectors)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            # Finished tasks leave ``tasks`` before the gather below, so
+            # JobCancelled from on_batch must be kept here too or it is lost.
+            failures.append(e)
+        finally:
+            semaphore.release()
+
+    try:
+        while not failures:
+            await semaphore.acquire()
+            batch = await loop.run_in_executor(None, lambda: list(islice(iterator, batch_size)))
+            if not batch:
+                semaphore.release()
+                break
+            task = asyncio.ensure_future(run(batch))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    if failures:
+        raise failures[0]
+
+
+def append_to_faiss(vector_store, embeddings, batch, vectors):
+    """Add embedded Documents to a DocumentIndex, creating it on the first batch"""
+    text_embeddings = [(doc.page_content, vector) for doc, vector in zip(batch, vectors)]
+    metadatas = [doc.metadata for doc in batch]
+    if vector_store is None:
+        vector_store = DocumentIndex.empty(embeddings, len(vectors[0]))
+    ids = vector_store.add_embeddings(text_embeddings, metadatas=metadatas)
+    return vector_store, ids
+
@@ -0,0 +1,190 @@
+import argparse
+import os
+import re
+import time
+
+from bs4 import BeautifulSoup, NavigableString, SoupStrainer
+from bs4.element import PreformattedString
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+
+# =========================
+# 🔹 Wiki HTML Extraction
+# =========================
+# Main-content containers in order of preference: MediaWiki's content area,
+# then the generic HTML5 landmarks.
+CONTENT_XPATHS = [
+    '//*[@id="mw-content-text"]',
+    '//*[contains(concat(" ", normalize-space(@class), " "), " mw-parser-output ")]',
+    "//main",
+    "//article",
+]
+CONTENT_STRAINERS = [
+    ('id="mw-content-text"', SoupStrainer(id="mw-content-text")),
+    ("mw-parser-output", SoupStrainer(class_="mw-parser-output")),
+    ("<main", SoupStrainer("main")),
+    ("<article", SoupStrainer("article")),
+]
+HEADINGS = {"h1", "h2", "h3", "h4"}
+NOISE_TAGS = ["script", "style", "nav", "footer", "header", "noscript"]
+# MediaWiki's "[edit]" links sit inside every heading.
+NOISE_CLASSES = ["mw-editsection"]
+WHITESPACE = re.compile(r"\s+")
+
+
+def parser_backend():
+    """Name of the parser extract_sections will use"""
+    return "lxml" if lxml is not None else "html.parser"
+
+
+def _sections_lxml(html):
+    try:
+        root = lxml.html.fromstring(html)
+    except etree.ParserError:
+        # Raised for empty documents.
+        return []
+    content = root
+    for xpath in CONTENT_XPATHS:
+        found = root.xpath(xpath)
+        if found:
+            content = found[0]
+            break
+    etree.strip_elements(content, *NOISE_TAGS, etree.Comment, with_tail=False)
+    for cls in NOISE_CLASSES:
+        for element in content.xpath(f'.//*[contains(concat(" ", normalize-space(@class), " "), " {cls} ")]'):
+            element.drop_tree()
+
+    sections = []
+    heading, parts = None, []
+    skip_depth = 0
+    for event, element in etree.iterwalk(content, events=("start", "end")):
+        if not isinstance(element.tag, str):
+            continue
+        if event == "start":
+            if skip_depth:
+                skip_depth += 1
+                continue
+            if element.tag in HEADINGS:
+                sections.append((heading, parts))
+                heading, parts = WHITESPACE.sub(" ", element.text_content()).strip() or None, []
+                skip_depth = 1
+                continue
+            if element.text:
+                parts.append(element.text)
+        else:
+            if skip_depth:
+                skip_depth -= 1
+            if element.tail and element is not content and not skip_depth:
+                parts.append(element.tail)
+    sections.append((heading, parts))
+    return sections
+
+
+def _sections_soup(html):
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    strainer = next((strainer for marker, strainer in CONTENT_STRAINERS if marker in html), None)
+    soup = BeautifulSoup(html, "html.parser", parse_only=strainer)
+    for element in soup(NOISE_TAGS):
+        element.decompose()
+    for element in soup.find_all(class_=NOISE_CLASSES):
+        element.decompose()
+
+    sections = []
+    heading, parts = None, []
+    heading_strings = set()
+    for node in soup.descendants:
+        if getattr(node, "name", None) in HEADINGS:
+            sections.append((heading, parts))
+            heading, parts = node.get_text(" ", strip=True) or None, []
+            heading_strings = {id(string) for string in node.strings}
+        elif (isinstance(node, NavigableString) and not isinstance(node, PreformattedString)
+              and id(node) not in heading_strings):
+            parts.append(node)
+    sections.append((heading, parts))
+    return sections
+
+
+def extract_sections(html, parser=None):
+    """(heading, text) for each section of a page's main content, in order.
+
+    Only the main-content container is kept; the text before the first
+    heading has heading None. Sections without text are dropped. ``parser``
+    forces "lxml" or "html.parser" instead of the best available.
+    """
+    parser = parser or parser_backend()
+    raw = _sections_lxml(html) if parser == "lxml" else _sections_soup(html)
+    sections = []
+    for heading, parts in raw:
+        text = " ".join(part.strip() for part in parts if part.strip())
+        if text:
+            sections.append((heading, text))
+    return sections
+
+
+def _baseline_text(html):
+    """The previous extraction: full html.parser tree, pruned and searched by selector"""
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(["script", "style", "nav", "footer", "header"]):
+        element.decompose()
+    for selector in ["#mw-content-text", ".mw-parser-output", "main", "article"]:
+        content_div = soup.select_one(selector)
+        if content_div:
+            return content_div.get_text(separator=" ", strip=True)
+    return soup.get_text(separator=" ", strip=True)
+
+
+def _pages_per_second(extract, pages, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            extract(page)
+    return len(pages) * repeat / (time.perf_counter() - started)
+
+
+# Saved MediaWiki-style pages shipped for the benchmark.
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "wiki")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark wiki HTML extraction over saved pages")
+    parser.add_argument("fixtures", nargs="?", default=FIXTURES_DIR,
+                        help="directory of saved .html pages (default: the pages in fixtures/wiki)")
+    parser.add_argument("--fetch", nargs="*", default=[], metavar="URL", help="save these pages into the directory first")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the fixtures per extractor")
+    args = parser.parse_args()
+
+    if args.fetch:
+        from wiki_crawler import fetch, make_session
+        os.makedirs(args.fixtures, exist_ok=True)
+        session = make_session()
+        for url in args.fetch:
+            _, body = fetch(session, url)
+            name = re.sub(r"[^A-Za-z0-9_.-]+", "_", url.split("://", 1)[-1]).strip("_")
+            with open(os.path.join(args.fixtures, name + ".html"), "wb") as f:
+                f.write(body)
+
+    pages = []
+    for name in sorted(os.listdir(args.fixtures)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(args.fixtures, name), "rb") as f:
+                pages.append(f.read())
+    if not pages:
+        parser.error(f"No .html fixtures in {args.fixtures}")
+
+    size = sum(len(page) for page in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {size:.0f} KiB on average, {args.repeat} passes")
+    rows = [("before (html.parser, full tree)", _baseline_text), (f"after ({parser_backend()})", extract_sections)]
+    if lxml is not None:
+        rows.append(("after (html.parser + strainer)", lambda html: extract_sections(html, "html.parser")))
+    for label, extract in rows:
+        print(f"{label:<34} {_pages_per_second(extract, pages, args.repeat):>8.1f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
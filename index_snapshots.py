@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import faiss
+
+from chunk_store import ChunkStore
+from vector_index import DocumentIndex
+
+
+# =========================
+# 🔹 Per-user Index Snapshots
+# =========================
+# A user's snapshot directory holds numbered generations (``gen-<n>/``) and a
+# ``CURRENT`` file naming the live one. A new generation is written in full
+# and only then does ``CURRENT`` switch over with an atomic rename, so a crash
+# mid-save leaves the previous snapshot untouched.
+CURRENT_FILE = "CURRENT"
+
+
+def snapshot_dir(root, owner):
+    """Directory holding the snapshots of one user"""
+    digest = hashlib.sha256(owner.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(root, digest)
+
+
+def _current_generation(directory):
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def save_snapshot(directory, vector_store, uploaded_content):
+    """Write the index, chunk store, search state and content list as a new generation"""
+    os.makedirs(directory, exist_ok=True)
+    previous = _current_generation(directory)
+    number = int(previous.split("-")[1]) + 1 if previous else 1
+    generation = f"gen-{number}"
+
+    staging = tempfile.mkdtemp(dir=directory, prefix=".staging-")
+    try:
+        with vector_store.lock:
+            faiss.write_index(vector_store.index, os.path.join(staging, "index.faiss"))
+            vector_store.chunks.save(os.path.join(staging, "chunks"))
+            with open(os.path.join(staging, "state.pkl"), "wb") as f:
+                pickle.dump({
+                    "doc_chunks": vector_store.doc_chunks,
+                    "content_hash": vector_store.content_hash,
+                    "lexical": vector_store.lexical,
+                    "near_duplicates": vector_store.near_duplicates,
+                    "shared_chunks": vector_store.shared_chunks,
+                }, f)
+        with open(os.path.join(staging, "content.json"), "w", encoding="utf-8") as f:
+            json.dump(uploaded_content, f)
+        os.replace(staging, os.path.join(directory, generation))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    fd, pointer = tempfile.mkstemp(dir=directory, prefix=".current-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(generation)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+    # Older generations and abandoned staging directories are now unreachable.
+    for name in os.listdir(directory):
+        if name != generation and (name.startswith("gen-") or name.startswith(".staging-")):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def load_snapshot(directory, embeddings):
+    """Load the live snapshot with a memory-mapped index and chunk store, or None if there is none"""
+    generation = _current_generation(directory)
+    if generation is None:
+        return None, []
+    path = os.path.join(directory, generation)
+    # IO_FLAG_MMAP would read flat and IDMap vectors into private memory;
+    # IO_FLAG_MMAP_IFC maps every tier. The index is read-only until the
+    # session first changes it (see DocumentIndex._own_index).
+    index = faiss.read_index(os.path.join(path, "index.faiss"), faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    if os.path.exists(os.path.join(path, "state.pkl")):
+        with open(os.path.join(path, "state.pkl"), "rb") as f:
+            state = pickle.load(f)
+        chunks = ChunkStore.load(os.path.join(path, "chunks"))
+    else:
+        # Generations written before the chunk store pickled an InMemoryDocstore.
+        with open(os.path.join(path, "docstore.pkl"), "rb") as f:
+            state = pickle.load(f)
+        chunks = ChunkStore.from_documents(
+            (faiss_id, state["docstore"].search(id_)) for faiss_id, id_ in state["index_to_docstore_id"].items()
+        )
+    with open(os.path.join(path, "content.json"), "r", encoding="utf-8") as f:
+        uploaded_content = json.load(f)
+    vector_store = DocumentIndex(
+        embeddings, index, chunks,
+        doc_chunks=state["doc_chunks"], content_hash=state.get("content_hash"), lexical=state.get("lexical"),
+        near_duplicates=state.get("near_duplicates"), shared_chunks=state.get("shared_chunks"), index_mapped=True
+    )
+    return vector_store, uploaded_content
+
+
+def delete_snapshot(directory):
+    """Forget everything stored for a user"""
+    shutil.rmtree(directory, ignore_errors=True)
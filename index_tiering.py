@@ -0,0 +1,207 @@
+import argparse
+import json
+import time
+from dataclasses import dataclass
+
+import faiss
+import numpy as np
+
+
+# =========================
+# 🔹 Index Tiering
+# =========================
+@dataclass
+class TierPolicy:
+    """When and how a session's exact flat index becomes an approximate one.
+
+    ``kind`` is ``"ivf"`` (the default, since IVF removes documents in place)
+    or ``"hnsw"`` (rebuilt on removal); ``quantization`` is ``"none"``,
+    ``"sq8"`` or ``"pq"``.
+    """
+    threshold: int = 200_000
+    kind: str = "ivf"
+    quantization: str = "none"
+    nprobe: int = 16
+    ef_search: int = 64
+    hnsw_m: int = 32
+
+
+def index_tier(index):
+    """Name of the tier an index is on: flat, ivf or hnsw"""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf"
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def _pq_subquantizers(dim):
+    # Largest divisor of dim that keeps sub-vectors at least 8 wide.
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _encoding(policy, dim):
+    if policy.quantization == "sq8":
+        return "SQ8"
+    if policy.quantization == "pq":
+        return f"PQ{_pq_subquantizers(dim)}"
+    return "Flat"
+
+
+def apply_search_params(index, policy):
+    """Set nprobe / efSearch on an approximate index; flat indexes are left alone"""
+    tier = index_tier(index)
+    if tier == "ivf":
+        faiss.extract_index_ivf(index).nprobe = policy.nprobe
+    elif tier == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efSearch = policy.ef_search
+
+
+def build_index(vectors, ids, policy):
+    """Train and fill an approximate index of the policy's kind"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    encoding = _encoding(policy, dim)
+
+    if policy.kind == "hnsw":
+        description = f"HNSW{policy.hnsw_m}" + ("" if encoding == "Flat" else f"_{encoding}")
+        index = faiss.IndexIDMap2(faiss.index_factory(dim, description))
+        index.train(vectors)
+    else:
+        nlist = max(1, min(count // 39, int(4 * np.sqrt(count))))
+        index = faiss.index_factory(dim, f"IVF{nlist},{encoding}")
+        index.train(vectors)
+        # A hashtable direct map lets remove_ids and reconstruct work by ID
+        # without scanning every inverted list.
+        faiss.extract_index_ivf(index).set_direct_map_type(faiss.DirectMap.Hashtable)
+
+    index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+    apply_search_params(index, policy)
+    return index
+
+
+def flat_contents(index):
+    """IDs and vectors held by an IndexIDMap2 over a flat or HNSW index"""
+    ids = faiss.vector_to_array(index.id_map)
+    vectors = index.index.reconstruct_n(0, index.ntotal) if index.ntotal else np.zeros((0, index.d), np.float32)
+    return ids, vectors
+
+
+def maybe_upgrade(index, policy):
+    """Return an approximate replacement once a flat index crosses the threshold, else None"""
+    if index_tier(index) != "flat" or index.ntotal < policy.threshold:
+        return None
+    ids, vectors = flat_contents(index)
+    return build_index(vectors, ids, policy)
+
+
+def remove_ids(index, ids):
+    """Remove IDs from any tier, returning the index to keep using"""
+    ids = np.asarray(ids, dtype=np.int64)
+    if index_tier(index) != "hnsw":
+        index.remove_ids(ids)
+        return index
+    # HNSW graphs cannot drop nodes, so rebuild from the surviving vectors.
+    kept_ids, vectors = flat_contents(index)
+    keep = ~np.isin(kept_ids, ids)
+    rebuilt = faiss.clone_index(index)
+    rebuilt.reset()
+    if keep.any():
+        rebuilt.add_with_ids(vectors[keep], kept_ids[keep])
+    return rebuilt
+
+
+# =========================
+# 🔹 Recall vs Latency Report
+# =========================
+def _search_latencies(index, queries, k):
+    labels = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        _, found = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        labels[i] = found[0]
+    return labels, latencies
+
+
+def _row(name, params, index, labels, truth, latencies, k):
+    hits = sum(len(set(found[found >= 0]) & set(expected)) for found, expected in zip(labels, truth))
+    return {
+        "index": name,
+        "params": params,
+        f"recall@{k}": round(hits / (len(truth) * k), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "bytes": len(faiss.serialize_index(index)),
+    }
+
+
+def recall_report(vectors, k=5, query_count=200, nprobes=(1, 4, 16, 64), ef_searches=(16, 64, 256), seed=0):
+    """Recall@k, per-query latency and size of each tier against exact flat search.
+
+    Queries are held out of the indexed vectors so no query finds itself.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(vectors))
+    queries, base = vectors[order[:query_count]], vectors[order[query_count:]]
+    ids = np.arange(len(base), dtype=np.int64)
+
+    flat = faiss.IndexIDMap2(faiss.IndexFlatL2(base.shape[1]))
+    flat.add_with_ids(base, ids)
+    truth, latencies = _search_latencies(flat, queries, k)
+    rows = [_row("flat", {}, flat, truth, truth, latencies, k)]
+
+    for quantization in ("none", "sq8", "pq"):
+        ivf = build_index(base, ids, TierPolicy(kind="ivf", quantization=quantization))
+        for nprobe in nprobes:
+            apply_search_params(ivf, TierPolicy(nprobe=nprobe))
+            labels, latencies = _search_latencies(ivf, queries, k)
+            rows.append(_row(f"ivf/{quantization}", {"nprobe": nprobe}, ivf, labels, truth, latencies, k))
+
+        hnsw = build_index(base, ids, TierPolicy(kind="hnsw", quantization=quantization))
+        for ef_search in ef_searches:
+            apply_search_params(hnsw, TierPolicy(ef_search=ef_search))
+            labels, latencies = _search_latencies(hnsw, queries, k)
+            rows.append(_row(f"hnsw/{quantization}", {"efSearch": ef_search}, hnsw, labels, truth, latencies, k))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare approximate index tiers against exact flat search")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--snapshot", help="user snapshot directory whose vectors to use")
+    source.add_argument("--synthetic", type=int, metavar="N", help="use N random vectors instead")
+    parser.add_argument("--dim", type=int, default=768, help="dimension of synthetic vectors")
+    parser.add_argument("--k", type=int, default=5, help="neighbours per query")
+    parser.add_argument("--queries", type=int, default=200, help="held-out queries")
+    parser.add_argument("--json", help="also write the rows to this file")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        from index_snapshots import load_snapshot
+        vector_store, _ = load_snapshot(args.snapshot, None)
+        if vector_store is None:
+            parser.error(f"No snapshot found in {args.snapshot}")
+        vectors = np.vstack([vector_store.index.reconstruct(i) for i in sorted(vector_store.index_to_docstore_id)])
+    else:
+        vectors = np.random.default_rng(1).standard_normal((args.synthetic, args.dim)).astype(np.float32)
+
+    rows = recall_report(vectors, k=args.k, query_count=args.queries)
+    print(f"{'index':<12} {'params':<18} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p95 ms':>8} {'MB':>8}")
+    for row in rows:
+        params = ", ".join(f"{key}={value}" for key, value in row["params"].items())
+        print(f"{row['index']:<12} {params:<18} {row[f'recall@{args.k}']:>9} "
+              f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['bytes'] / 1e6:>8.2f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
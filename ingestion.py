@@ -0,0 +1,314 @@
+import bisect
+import hashlib
+from collections import deque
+
+
+# =========================
+# 🔹 Streaming Ingestion
+# =========================
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+SEPARATORS = ("\n\n", "\n", " ", "")
+
+
+class IngestionError(Exception):
+    """Source could not be read; the message is shown to the user as is"""
+
+
+def _separator_splits(text, start, end, separator):
+    """Offsets of text[start:end] split before each separator, which stays with the piece after it"""
+    if not separator:
+        return [(i, i + 1) for i in range(start, end)]
+    splits = []
+    piece = start
+    at = text.find(separator, start, end)
+    while at != -1:
+        if at > piece:
+            splits.append((piece, at))
+        piece = at
+        at = text.find(separator, at + len(separator), end)
+    if end > piece:
+        splits.append((piece, end))
+    return splits
+
+
+def _strip(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _merge_splits(text, splits, chunk_size, chunk_overlap, spans):
+    """Pack consecutive splits into chunks of at most chunk_size, carrying up to chunk_overlap over"""
+    current = deque()
+    total = 0
+    for start, end in splits:
+        length = end - start
+        if total + length > chunk_size and current:
+            span = _strip(text, current[0][0], current[-1][1])
+            if span[0] < span[1]:
+                spans.append(span)
+            while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                first = current.popleft()
+                total -= first[1] - first[0]
+        current.append((start, end))
+        total += length
+    if current:
+        span = _strip(text, current[0][0], current[-1][1])
+        if span[0] < span[1]:
+            spans.append(span)
+
+
+def _split(text, start, end, separators, chunk_size, chunk_overlap, spans):
+    separator, finer = separators[-1], ()
+    for i, candidate in enumerate(separators):
+        if not candidate:
+            separator = candidate
+            break
+        if text.find(candidate, start, end) != -1:
+            separator, finer = candidate, separators[i + 1:]
+            break
+
+    good = []
+    for piece in _separator_splits(text, start, end, separator):
+        if piece[1] - piece[0] < chunk_size:
+            good.append(piece)
+            continue
+        if good:
+            _merge_splits(text, good, chunk_size, chunk_overlap, spans)
+            good = []
+        if finer:
+            _split(text, piece[0], piece[1], finer, chunk_size, chunk_overlap, spans)
+        else:
+            spans.append(piece)
+    if good:
+        _merge_splits(text, good, chunk_size, chunk_overlap, spans)
+
+
+def split_spans(text, start=0, end=None, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, separators=SEPARATORS):
+    """(start, end) offsets of the chunks of text[start:end].
+
+    Cuts exactly where LangChain's RecursiveCharacterTextSplitter (separators
+    kept, whitespace stripped) would, but works on offsets into the one
+    buffer instead of copying every split, merge and chunk into new strings.
+    """
+    spans = []
+    _split(text, start, len(text) if end is None else end, tuple(separators), chunk_size, chunk_overlap, spans)
+    return spans
+
+
+class Chunk:
+    """One chunk as offsets into its document's text.
+
+    ``start`` and ``end`` are offsets into the whole document as it was fed
+    to the splitter; the text is only sliced out of the shared buffer when
+    ``page_content`` is read, at embedding and display time. Has the
+    ``page_content`` / ``metadata`` shape of a LangChain Document, so it
+    flows through deduplication, embedding and indexing unchanged.
+    """
+    __slots__ = ("buffer", "base", "start", "end", "metadata")
+
+    def __init__(self, buffer, base, start, end, metadata):
+        self.buffer = buffer
+        self.base = base
+        self.start = start
+        self.end = end
+        self.metadata = metadata
+
+    @property
+    def page_content(self):
+        return self.buffer[self.start - self.base:self.end - self.base]
+
+    @property
+    def doc_id(self):
+        return self.metadata.get("doc_id")
+
+    @property
+    def page_number(self):
+        return self.metadata.get("page_number")
+
+    @property
+    def section(self):
+        return self.metadata.get("section")
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"Chunk({self.doc_id!r}, {self.start}, {self.end}, page={self.page_number!r})"
+
+
+class StreamingSplitter:
+    """Incremental splitter for one document that arrives in pieces.
+
+    Pieces (pages, sections) are buffered until ``window_chars`` is reached,
+    the buffer is split, and every chunk except the last two is emitted; the
+    tail is kept so a chunk is never cut at a buffer boundary. Each chunk is
+    tagged with the metadata of the piece it starts in.
+
+    Each window is cut exactly as ``split_spans`` would cut it, but the tail
+    is split again with the next window's text, so a document longer than
+    one window can get different cuts around each seam than splitting all
+    of its text at once.
+    """
+
+    def __init__(self, window_chars=64_000):
+        self.window_chars = max(window_chars, 4 * CHUNK_SIZE)
+        self._parts = []
+        self._starts = []
+        self._metadatas = []
+        self._size = 0
+        # Document offset of the start of the buffered text.
+        self._base = 0
+
+    def feed(self, text, metadata):
+        """Add the next piece of the document and yield chunks that are final"""
+        if not text:
+            return
+        self._parts.append(text)
+        self._starts.append(self._size)
+        self._metadatas.append(metadata)
+        self._size += len(text)
+        if self._size >= self.window_chars:
+            yield from self._drain(final=False)
+
+    def close(self):
+        """Yield the remaining chunks once the document is complete"""
+        if self._parts:
+            yield from self._drain(final=True)
+
+    def _drain(self, final):
+        text = "".join(self._parts)
+        spans = split_spans(text)
+        ready = len(spans) if final else len(spans) - 2
+        if ready <= 0:
+            return
+
+        base = self._base
+        for start, end in spans[:ready]:
+            piece = bisect.bisect_right(self._starts, start) - 1
+            yield Chunk(text, base, base + start, base + end, dict(self._metadatas[piece]))
+
+        if final:
+            self._parts, self._starts, self._metadatas, self._size = [], [], [], 0
+            return
+
+        cut = spans[ready][0]
+        parts, starts, metadatas = [], [], []
+        for piece_start, part, metadata in zip(self._starts, self._parts, self._metadatas):
+            if piece_start + len(part) <= cut:
+                continue
+            offset = max(0, cut - piece_start)
+            starts.append(piece_start + offset - cut)
+            parts.append(part[offset:])
+            metadatas.append(metadata)
+        self._parts, self._starts, self._metadatas = parts, starts, metadatas
+        self._size = sum(len(part) for part in parts)
+        self._base = base + cut
+
+
+def split_stream(pieces, window_chars=64_000):
+    """Turn (document_key, text, metadata) pieces into chunks as they arrive.
+
+    Consecutive pieces with the same key are split as one document, so chunk
+    boundaries can span pages. Documents shorter than ``window_chars`` are
+    cut as if split whole; longer ones may be cut differently near window
+    seams (see StreamingSplitter).
+    """
+    current_key = None
+    splitter = None
+    for key, text, metadata in pieces:
+        if key != current_key:
+            if splitter is not None:
+                yield from splitter.close()
+            current_key = key
+            splitter = StreamingSplitter(window_chars)
+        yield from splitter.feed(text, metadata)
+    if splitter is not None:
+        yield from splitter.close()
+
+
+# =========================
+# 🔹 Ingestion Manifest
+# =========================
+# Each uploaded source records a hash of the whole file and one per unit
+# (PDF page, Notion member, crawled wiki page), so a re-upload only
+# re-ingests the units that changed.
+def content_hash(file, block_size=1 << 20):
+    """Hex digest of an uploaded file's bytes; the read position is restored"""
+    digest = hashlib.blake2b(digest_size=16)
+    position = file.tell() if hasattr(file, "tell") else None
+    if hasattr(file, "seek"):
+        file.seek(0)
+    for block in iter(lambda: file.read(block_size), b""):
+        digest.update(block)
+    if position is not None:
+        file.seek(position)
+    return digest.hexdigest()
+
+
+def unit_hash(data):
+    """Hex digest of one unit's raw bytes"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def diff_units(previous, current):
+    """(changed, vanished) unit keys between two {unit: hash} manifests.
+
+    ``changed`` holds units that are new or whose hash differs.
+    """
+    changed = {unit for unit, digest in current.items() if previous.get(unit) != digest}
+    vanished = set(previous) - set(current)
+    return changed, vanished
+
+
+def resplit_pages(changed, chunk_pages, page_count):
+    """Plan which pages of a paged document to split again after an edit.
+
+    Chunks run across page boundaries, so each run of ``changed`` pages is
+    widened back to the nearest earlier page that starts an old chunk (one
+    of ``chunk_pages``), the head seam, and forward to the next such page,
+    the tail seam. Returns (pages to extract, pages whose old chunks are
+    replaced, head seams, tail seams); a head seam is split from where its
+    first old chunk begins and a tail seam only up to there, so the new
+    chunks meet the kept ones where the old ones did.
+    """
+    extract, replaced, heads, tails = set(), set(), set(), set()
+    end = 0
+    for page in sorted(changed):
+        if page <= end:
+            continue
+        first = page - 1
+        while first > end and first not in chunk_pages:
+            first -= 1
+        if end and first <= end + 1:
+            # Close enough to the previous run to re-split both in one go.
+            tails.discard(end + 1)
+            first = end + 1
+        elif first < 1:
+            first = 1
+        else:
+            heads.add(first)
+        end = page
+        while end < page_count and (end + 1 in changed or end + 1 not in chunk_pages):
+            end += 1
+        replaced.update(range(first, end + 1))
+        extract.update(range(first, end + 1))
+        if end < page_count:
+            tails.add(end + 1)
+            extract.add(end + 1)
+    return extract, replaced, heads, tails
+
+
+def seam_offset(text, chunk_texts, probes=(40, 12)):
+    """Where the earliest of a page's old chunks begins in its text, or None if none is found"""
+    found = []
+    for chunk in chunk_texts:
+        for probe in probes:
+            position = text.find(chunk[:probe])
+            if position >= 0:
+                found.append(position)
+                break
+    return min(found, default=None)
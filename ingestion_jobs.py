@@ -0,0 +1,155 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+# =========================
+# 🔹 Background Ingestion Jobs
+# =========================
+_local = threading.local()
+
+
+class JobCancelled(BaseException):
+    """Raised inside a job once it is cancelled.
+
+    A BaseException, like asyncio's CancelledError, so the broad ``except
+    Exception`` handlers of the ingestion path (retries, error reporting)
+    let it through to the code that rolls the job back.
+    """
+
+
+def current_job():
+    """Job the calling worker thread is running, or None outside a job"""
+    return getattr(_local, "job", None)
+
+
+class Job:
+    """One queued ingestion with its per-stage progress, messages and outcome"""
+
+    def __init__(self, job_id, owner, label, work):
+        self.id = job_id
+        self.owner = owner
+        self.label = label
+        self.work = work
+        self.status = "queued"
+        self.stages = OrderedDict()
+        self.messages = []
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def cancelling(self):
+        return self._cancel.is_set() and not self.done
+
+    def check(self):
+        """Raise JobCancelled if the job has been cancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def advance(self, stage, count=1):
+        """Count work done in a stage; also a cancellation point"""
+        self.check()
+        self.stages[stage] = self.stages.get(stage, 0) + count
+
+    def track(self, stage, iterable):
+        """Pass a stream through, counting its items under ``stage``"""
+        for item in iterable:
+            self.advance(stage)
+            yield item
+
+    def notify(self, kind, message):
+        """Keep a message ("success", "info", "warning", "error") to show when the job is looked at"""
+        self.messages.append((kind, message))
+
+
+class JobQueue:
+    """Worker threads running ingestion jobs, taking turns between owners.
+
+    Each owner (a user or session) has its own FIFO and at most one job
+    running at a time; idle workers serve owners round-robin, so one user's
+    backlog of uploads cannot starve another's. ``work(job)`` runs on a
+    worker thread with ``current_job()`` set.
+    """
+
+    def __init__(self, workers=2):
+        self._pending = OrderedDict()
+        self._running = set()
+        self._ids = itertools.count(1)
+        self._changed = threading.Condition()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"ingest-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, owner, label, work):
+        job = Job(next(self._ids), owner, label, work)
+        with self._changed:
+            self._pending.setdefault(owner, deque()).append(job)
+            self._changed.notify()
+        return job
+
+    def cancel(self, job):
+        """Stop a job: a queued one never starts, a running one stops at its next checkpoint"""
+        job._cancel.set()
+        with self._changed:
+            queue = self._pending.get(job.owner)
+            if queue is not None and job in queue:
+                queue.remove(job)
+                if not queue:
+                    del self._pending[job.owner]
+                job.status = "cancelled"
+                job.finished = time.time()
+
+    def position(self, job):
+        """Jobs ahead of a queued one in its owner's queue"""
+        with self._changed:
+            queue = self._pending.get(job.owner, ())
+            return list(queue).index(job) if job in queue else 0
+
+    def _next(self):
+        for owner, queue in self._pending.items():
+            if owner in self._running:
+                continue
+            job = queue.popleft()
+            # The owner goes to the back of the rotation.
+            del self._pending[owner]
+            if queue:
+                self._pending[owner] = queue
+            return job
+        return None
+
+    def _work(self):
+        while True:
+            with self._changed:
+                job = self._next()
+                while job is None:
+                    self._changed.wait()
+                    job = self._next()
+                self._running.add(job.owner)
+                job.status = "running"
+                job.started = time.time()
+            _local.job = job
+            try:
+                job.work(job)
+                job.status = "done"
+            except JobCancelled:
+                job.status = "cancelled"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                _local.job = None
+                job.finished = time.time()
+                with self._changed:
+                    self._running.discard(job.owner)
+                    self._changed.notify_all()
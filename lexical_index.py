@@ -0,0 +1,313 @@
+import json
+import math
+import mmap
+import os
+import re
+from array import array
+
+import numpy as np
+
+
+# =========================
+# 🔹 Lexical (BM25) Index
+# =========================
+# Identifiers such as ERR-404, v2.1.3 or part_no_17 are kept whole and also
+# indexed by their parts, so both "ERR-404" and "404" find them.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+PART_PATTERN = re.compile(r"[a-z0-9]+")
+QUESTION_WORDS = {
+    "what", "why", "how", "when", "where", "who", "which", "whom", "whose",
+    "is", "are", "can", "could", "does", "do", "should", "would", "explain", "describe",
+}
+
+
+def tokenize(text):
+    """Lower-cased terms of a text, identifiers whole and split"""
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(PART_PATTERN.findall(token))
+    return terms
+
+
+def is_keyword_query(query):
+    """Whether a query reads like a lookup rather than a natural-language question.
+
+    Short queries that do not open with a question word, and any query
+    containing an identifier (letters mixed with digits, or joined by - _ . /),
+    are answered from the lexical index alone.
+    """
+    words = query.lower().split()
+    if not words:
+        return False
+    if any(re.search(r"\d", word) and re.search(r"[a-z]", word) or re.search(r"\w[-_./]\w", word)
+           for word in words):
+        return True
+    return len(words) <= 3 and words[0] not in QUESTION_WORDS and not query.rstrip().endswith("?")
+
+
+class LexicalIndex:
+    """Incrementally built BM25 index over integer chunk IDs.
+
+    Each chunk gets a slot, and each term's postings are two ``array('i')``
+    columns (slots and term frequencies) that only ever grow. ``lengths``
+    and ``chunk_ids`` are indexed by slot. Removed chunks are tombstoned by
+    zeroing their length; their postings are compacted away once they make
+    up a quarter of the entries, and only then are their slots reused, so
+    the arrays stay as long as the live chunks however often documents are
+    removed and re-added.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = array("i")
+        self.chunk_ids = array("i")
+        self.slots = {}
+        self.live = 0
+        self.total_length = 0
+        self.dead_postings = 0
+        self.total_postings = 0
+        self._dead_slots = []
+        self._free_slots = []
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "slots" not in state:
+            # Pickled when postings held chunk IDs: each ID is its own slot.
+            self.chunk_ids = array("i", range(len(self.lengths)))
+            self.slots = {chunk_id: chunk_id for chunk_id, length in enumerate(self.lengths) if length}
+            self._dead_slots = [chunk_id for chunk_id, length in enumerate(self.lengths) if not length]
+            self._free_slots = []
+
+    def __len__(self):
+        return self.live
+
+    def add(self, chunk_ids, texts):
+        for chunk_id, text in zip(chunk_ids, texts):
+            terms = tokenize(text)
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self.chunk_ids[slot] = chunk_id
+            else:
+                slot = len(self.lengths)
+                self.lengths.append(0)
+                self.chunk_ids.append(chunk_id)
+            self.slots[chunk_id] = slot
+            self.lengths[slot] = max(1, len(terms))
+            self.live += 1
+            self.total_length += self.lengths[slot]
+
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                slots, freqs = self.postings.setdefault(term, (array("i"), array("i")))
+                slots.append(slot)
+                freqs.append(count)
+            self.total_postings += len(counts)
+
+    def remove(self, chunk_ids, texts):
+        for chunk_id, text in zip(chunk_ids, texts):
+            slot = self.slots.pop(chunk_id, None)
+            if slot is None:
+                continue
+            self.total_length -= self.lengths[slot]
+            self.lengths[slot] = 0
+            self._dead_slots.append(slot)
+            self.live -= 1
+            self.dead_postings += len(set(tokenize(text)))
+        if self.dead_postings * 4 > self.total_postings:
+            self._compact()
+
+    def _compact(self):
+        lengths = np.frombuffer(self.lengths, dtype=np.int32)
+        for term in list(self.postings):
+            slots, freqs = self.postings[term]
+            slot_array = np.frombuffer(slots, dtype=np.int32)
+            alive = lengths[slot_array] > 0
+            if alive.all():
+                continue
+            if not alive.any():
+                del self.postings[term]
+                continue
+            self.postings[term] = (
+                array("i", slot_array[alive].tobytes()),
+                array("i", np.frombuffer(freqs, dtype=np.int32)[alive].tobytes()),
+            )
+        self.total_postings -= self.dead_postings
+        self.dead_postings = 0
+        # No postings point at the removed chunks' slots any more.
+        self._free_slots.extend(self._dead_slots)
+        self._dead_slots = []
+
+    def _length_array(self):
+        return np.frombuffer(self.lengths, dtype=np.int32)
+
+    def _postings(self, term):
+        """(slots, term frequencies) of a term as int32 arrays, or None"""
+        if term not in self.postings:
+            return None
+        slots, freqs = self.postings[term]
+        return np.frombuffer(slots, dtype=np.int32), np.frombuffer(freqs, dtype=np.int32)
+
+    def _slot_chunk_ids(self, slots):
+        return np.frombuffer(self.chunk_ids, dtype=np.int32)[slots]
+
+    def search(self, query, k=5):
+        """Top-k (chunk_id, score) pairs by BM25"""
+        if not self.live:
+            return []
+        lengths = self._length_array()
+        average_length = self.total_length / self.live
+        matched_ids = []
+        matched_scores = []
+        for term in set(tokenize(query)):
+            postings = self._postings(term)
+            if postings is None:
+                continue
+            id_array, freqs = postings
+            tf = freqs.astype(np.float32)
+            doc_lengths = lengths[id_array]
+            alive = doc_lengths > 0
+            df = int(alive.sum())
+            if not df:
+                continue
+            idf = math.log(1 + (self.live - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[alive] / average_length)
+            matched_ids.append(id_array[alive])
+            matched_scores.append(idf * tf[alive] * (self.k1 + 1) / (tf[alive] + norm))
+        if not matched_ids:
+            return []
+
+        unique_ids, inverse = np.unique(np.concatenate(matched_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(matched_scores))
+        top = np.argsort(-scores)[:k]
+        chunk_ids = self._slot_chunk_ids(unique_ids[top])
+        return [(int(chunk_id), float(scores[i])) for chunk_id, i in zip(chunk_ids, top)]
+
+
+# =========================
+# 🔹 Mapped Lexical Index
+# =========================
+# A read-only BM25 index written once (for a library) as flat files:
+#
+#   lexical.json          k1, b, live chunk count and total length
+#   lexicon.bin           terms, UTF-8, sorted, back to back
+#   lexicon_offsets.npy   int64 byte offsets into lexicon.bin (terms + 1 entries)
+#   postings_ids.npy      int32 chunk IDs of every term's postings, back to back
+#   postings_freqs.npy    int32 term frequencies, aligned with postings_ids
+#   postings_offsets.npy  int64 offsets into the postings (terms + 1 entries)
+#   lengths.npy           int32 length of each chunk in terms, 0 if removed
+#
+# Every file is memory-mapped on open, so processes share one copy and
+# nothing is built at query time.
+def write_lexical_index(lexical, directory):
+    """Write a LexicalIndex as flat files that MappedLexicalIndex can map"""
+    if lexical.dead_postings:
+        lexical._compact()
+    terms = sorted(lexical.postings, key=lambda term: term.encode("utf-8"))
+    encoded = [term.encode("utf-8") for term in terms]
+    lexicon_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum([len(term) for term in encoded], out=lexicon_offsets[1:])
+    postings_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum([len(lexical.postings[term][0]) for term in terms], out=postings_offsets[1:])
+    ids = np.empty(int(postings_offsets[-1]), dtype=np.int32)
+    freqs = np.empty(int(postings_offsets[-1]), dtype=np.int32)
+    for i, term in enumerate(terms):
+        term_slots, term_freqs = lexical.postings[term]
+        ids[postings_offsets[i]:postings_offsets[i + 1]] = lexical._slot_chunk_ids(np.frombuffer(term_slots, dtype=np.int32))
+        freqs[postings_offsets[i]:postings_offsets[i + 1]] = np.frombuffer(term_freqs, dtype=np.int32)
+    # The mapped files are indexed by chunk ID rather than slot.
+    slot_lengths = np.frombuffer(lexical.lengths, dtype=np.int32)
+    live = slot_lengths > 0
+    live_ids = np.frombuffer(lexical.chunk_ids, dtype=np.int32)[live]
+    lengths = np.zeros(int(live_ids.max()) + 1 if len(live_ids) else 0, dtype=np.int32)
+    lengths[live_ids] = slot_lengths[live]
+
+    with open(os.path.join(directory, "lexicon.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(directory, "lexicon_offsets.npy"), lexicon_offsets)
+    np.save(os.path.join(directory, "postings_ids.npy"), ids)
+    np.save(os.path.join(directory, "postings_freqs.npy"), freqs)
+    np.save(os.path.join(directory, "postings_offsets.npy"), postings_offsets)
+    np.save(os.path.join(directory, "lengths.npy"), lengths)
+    with open(os.path.join(directory, "lexical.json"), "w", encoding="utf-8") as f:
+        json.dump({"k1": lexical.k1, "b": lexical.b, "live": lexical.live, "total_length": lexical.total_length}, f)
+
+
+class MappedLexicalIndex(LexicalIndex):
+    """Read-only BM25 index served from files written by write_lexical_index"""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, "lexical.json"), "r", encoding="utf-8") as f:
+            stats = json.load(f)
+        super().__init__(k1=stats["k1"], b=stats["b"])
+        self.live = stats["live"]
+        self.total_length = stats["total_length"]
+
+        def load(name):
+            return np.load(os.path.join(directory, name), mmap_mode="r")
+
+        self._lexicon_offsets = load("lexicon_offsets.npy")
+        self._postings_ids = load("postings_ids.npy")
+        self._postings_freqs = load("postings_freqs.npy")
+        self._postings_offsets = load("postings_offsets.npy")
+        self._lengths = load("lengths.npy")
+        with open(os.path.join(directory, "lexicon.bin"), "rb") as f:
+            # mmap refuses empty files; an empty index has no terms to look up.
+            self._lexicon = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self._lexicon_offsets[-1] else b""
+
+    @staticmethod
+    def exists(directory):
+        return os.path.exists(os.path.join(directory, "lexical.json"))
+
+    def add(self, chunk_ids, texts):
+        raise TypeError("A mapped lexical index is read-only")
+
+    def remove(self, chunk_ids, texts):
+        raise TypeError("A mapped lexical index is read-only")
+
+    def _length_array(self):
+        return self._lengths
+
+    def _slot_chunk_ids(self, slots):
+        # Written with chunk IDs in place of slots.
+        return slots
+
+    def _term_row(self, term):
+        """Position of a term in the sorted lexicon, by binary search, or None"""
+        key = term.encode("utf-8")
+        offsets = self._lexicon_offsets
+        low, high = 0, len(offsets) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if self._lexicon[offsets[middle]:offsets[middle + 1]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(offsets) - 1 and self._lexicon[offsets[low]:offsets[low + 1]] == key:
+            return low
+        return None
+
+    def _postings(self, term):
+        row = self._term_row(term)
+        if row is None:
+            return None
+        start, end = self._postings_offsets[row], self._postings_offsets[row + 1]
+        return self._postings_ids[start:end], self._postings_freqs[start:end]
+
+
+def reciprocal_rank_fusion(rankings, k=5, constant=60):
+    """Fuse ranked lists of Documents, identifying chunks by ID or text"""
+    scores = {}
+    documents = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking):
+            key = document.id or document.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (constant + rank + 1)
+            documents.setdefault(key, document)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[key] for key in best]
@@ -0,0 +1,216 @@
+import argparse
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from index_snapshots import load_snapshot
+from lexical_index import LexicalIndex, MappedLexicalIndex, write_lexical_index
+
+
+# =========================
+# 🔹 Shared Library Corpora
+# =========================
+# A library is a read-only directory built once by an administrator:
+#
+#   manifest.json      name, embedding model, dimension, chunk count, build version
+#   index.faiss        FAISS index; row i is chunk i
+#   text.bin           UTF-8 chunk texts back to back
+#   text_offsets.npy   int64 byte offsets into text.bin (n + 1 entries)
+#   meta.bin           one JSON object per chunk, back to back
+#   meta_offsets.npy   int64 byte offsets into meta.bin (n + 1 entries)
+#   lexical.json, lexicon.bin, postings_*.npy, lengths.npy
+#                      BM25 keyword index over row numbers (see lexical_index)
+#
+# Every file is memory-mapped on open, so all sessions and all server
+# processes share the same physical pages through the OS page cache.
+# ``python library.py`` re-opens each library it publishes and fails if that
+# costs more than a little resident memory, which would mean something is
+# being read into private memory instead.
+MAX_OPEN_RSS = 8 * 1024 * 1024
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None without /proc"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _write_blobs(directory, stem, blobs):
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    with open(os.path.join(directory, f"{stem}.bin"), "wb") as f:
+        for i, blob in enumerate(blobs):
+            f.write(blob)
+            offsets[i + 1] = offsets[i] + len(blob)
+    np.save(os.path.join(directory, f"{stem}_offsets.npy"), offsets)
+
+
+def publish_library(vector_store, directory, name, model):
+    """Write a FAISS store out as a read-only library, replacing any previous build"""
+    chunk_ids = sorted(vector_store.index_to_docstore_id)
+    documents = [vector_store.docstore.search(vector_store.index_to_docstore_id[i]) for i in chunk_ids]
+    # Library rows are addressed by position, so re-pack the vectors densely.
+    index = faiss.IndexFlatL2(vector_store.index.d)
+    if chunk_ids:
+        index.add(np.vstack([vector_store.index.reconstruct(i) for i in chunk_ids]))
+
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".library-")
+    try:
+        faiss.write_index(index, os.path.join(staging, "index.faiss"))
+        _write_blobs(staging, "text", [doc.page_content.encode("utf-8") for doc in documents])
+        _write_blobs(staging, "meta", [json.dumps(doc.metadata).encode("utf-8") for doc in documents])
+        lexical = LexicalIndex()
+        lexical.add(range(len(documents)), (doc.page_content for doc in documents))
+        write_lexical_index(lexical, staging)
+        with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "name": name,
+                "model": model,
+                "dim": vector_store.index.d,
+                "count": len(documents),
+                "version": uuid.uuid4().hex,
+            }, f)
+        # Sessions that already mapped the old build keep reading it until they
+        # reopen; new opens see the new build.
+        if os.path.exists(directory):
+            retired = tempfile.mkdtemp(dir=parent, prefix=".retired-")
+            os.replace(directory, os.path.join(retired, "library"))
+            shutil.rmtree(retired, ignore_errors=True)
+        os.replace(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+class Library:
+    """Memory-mapped, read-only corpus that can be searched next to a session's own store"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.name = manifest["name"]
+        self.model = manifest["model"]
+        self.dim = manifest["dim"]
+        self.version = manifest.get("version") or f"{self.name}:{manifest['count']}"
+        self.index = faiss.read_index(
+            os.path.join(directory, "index.faiss"),
+            # IO_FLAG_MMAP would still copy a flat index's vectors into private
+            # memory; IO_FLAG_MMAP_IFC serves them straight from the mapping.
+            faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+        )
+        self._text, self._text_offsets = self._map(directory, "text")
+        self._meta, self._meta_offsets = self._map(directory, "meta")
+        self._lexical = MappedLexicalIndex(directory) if MappedLexicalIndex.exists(directory) else None
+        self._lexical_lock = threading.Lock()
+
+    @staticmethod
+    def _map(directory, stem):
+        offsets = np.load(os.path.join(directory, f"{stem}_offsets.npy"), mmap_mode="r")
+        with open(os.path.join(directory, f"{stem}.bin"), "rb") as f:
+            # mmap refuses empty files; an empty library has nothing to read anyway.
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b""
+        return data, offsets
+
+    def __len__(self):
+        return self.index.ntotal
+
+    def document(self, i):
+        """Chunk i as a Document tagged with the library (and build) it came from"""
+        text = self.text(i)
+        metadata = json.loads(self._meta[self._meta_offsets[i]:self._meta_offsets[i + 1]])
+        metadata["library"] = self.name
+        return Document(id=f"{self.version}/{i}", page_content=text, metadata=metadata)
+
+    def stored_vectors(self, documents):
+        """Vectors of chunks this library returned, read back from the index; None for any other chunk"""
+        prefix = f"{self.version}/"
+        return [
+            self.index.reconstruct(int(document.id[len(prefix):]))
+            if document.id and document.id.startswith(prefix) else None
+            for document in documents
+        ]
+
+    def text(self, i):
+        """Text of chunk i"""
+        return self._text[self._text_offsets[i]:self._text_offsets[i + 1]].decode("utf-8")
+
+    def lexical_search(self, query, k=5):
+        """Top-k chunks by BM25 as (Document, score) pairs"""
+        if self._lexical is None:
+            # Libraries published before the keyword index was written out
+            # get one built in memory, once, on first use.
+            with self._lexical_lock:
+                if self._lexical is None:
+                    lexical = LexicalIndex()
+                    lexical.add(range(len(self)), (self.text(i) for i in range(len(self))))
+                    self._lexical = lexical
+        return [(self.document(chunk_id), score) for chunk_id, score in self._lexical.search(query, k)]
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        """Nearest chunks to a query vector as (Document, distance) pairs"""
+        if not len(self):
+            return []
+        query = np.asarray([embedding], dtype=np.float32)
+        distances, labels = self.index.search(query, k)
+        return [
+            (self.document(int(label)), float(distance))
+            for distance, label in zip(distances[0], labels[0])
+            if label >= 0
+        ]
+
+
+def open_libraries(root, model=None):
+    """Open every library under root, skipping ones built with another embedding model"""
+    libraries = []
+    if not os.path.isdir(root):
+        return libraries
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if name.startswith(".") or not os.path.exists(os.path.join(path, "manifest.json")):
+            continue
+        library = Library(path)
+        if model is None or library.model == model:
+            libraries.append(library)
+    return libraries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish a saved index as a shared read-only library")
+    parser.add_argument("snapshot", help="user snapshot directory to publish")
+    parser.add_argument("library", help="library directory to create or replace")
+    parser.add_argument("--name", required=True, help="name shown to users")
+    parser.add_argument("--model", default="models/embedding-001", help="embedding model the snapshot was built with")
+    args = parser.parse_args()
+
+    vector_store, _ = load_snapshot(args.snapshot, None)
+    if vector_store is None:
+        parser.error(f"No snapshot found in {args.snapshot}")
+    publish_library(vector_store, args.library, args.name, args.model)
+    print(f"Published {vector_store.index.ntotal} chunks to {args.library}")
+
+    before = current_rss()
+    library = Library(args.library)
+    after = current_rss()
+    if before is not None:
+        grown = after - before
+        print(f"Opening it added {grown / 1e6:.1f} MB of resident memory")
+        if grown > MAX_OPEN_RSS:
+            parser.exit(1, f"{args.library} is read into memory on open instead of being mapped\n")
+    del library
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import re
+import zlib
+
+import numpy as np
+
+
+# =========================
+# 🔹 Near-duplicate Chunk Detection
+# =========================
+# Chunks are fingerprinted with a 64-bit SimHash over word 3-shingles; two
+# chunks are near-duplicates when their fingerprints differ in at most
+# MAX_DISTANCE bits. Splitting the fingerprint into MAX_DISTANCE + 1 bands
+# guarantees such a pair agrees exactly on at least one band, so candidates
+# come from one dict lookup per band instead of a scan.
+SHINGLE_WORDS = 3
+MAX_DISTANCE = 3
+BANDS = MAX_DISTANCE + 1
+BAND_BITS = 64 // BANDS
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _mix(values):
+    # splitmix64 finaliser: spreads 32-bit CRCs over all 64 bits.
+    x = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def simhash(text):
+    """64-bit SimHash fingerprint of a text, or None if it has no words"""
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return None
+    hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64, count=len(words))
+    if len(words) >= SHINGLE_WORDS:
+        # Combine consecutive word hashes into shingle hashes; uint64 wraps.
+        shingles = hashes[:1 - SHINGLE_WORDS].copy()
+        for offset in range(1, SHINGLE_WORDS):
+            end = len(hashes) - SHINGLE_WORDS + 1 + offset
+            shingles = shingles * np.uint64(0x100000001B3) + hashes[offset:end]
+        hashes = shingles
+    bits = np.unpackbits(_mix(hashes).view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(hashes)
+    return int.from_bytes(np.packbits(votes > 0, bitorder="little").tobytes(), "little")
+
+
+def _bands(fingerprint):
+    mask = (1 << BAND_BITS) - 1
+    return [(fingerprint >> (band * BAND_BITS)) & mask for band in range(BANDS)]
+
+
+class NearDuplicateIndex:
+    """SimHash fingerprints of indexed chunks, banded for near-duplicate lookup"""
+
+    def __init__(self):
+        self.fingerprints = {}
+        self.buckets = [{} for _ in range(BANDS)]
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def add(self, chunk_ids, texts, doc_ids):
+        for chunk_id, text, doc_id in zip(chunk_ids, texts, doc_ids):
+            self.add_fingerprint(chunk_id, simhash(text), doc_id)
+
+    def add_fingerprint(self, chunk_id, fingerprint, doc_id=None):
+        if fingerprint is None:
+            return
+        self.fingerprints[chunk_id] = (fingerprint, doc_id)
+        for bucket, band in zip(self.buckets, _bands(fingerprint)):
+            bucket.setdefault(band, []).append(chunk_id)
+
+    def remove(self, chunk_ids):
+        for chunk_id in chunk_ids:
+            entry = self.fingerprints.pop(chunk_id, None)
+            if entry is None:
+                continue
+            for bucket, band in zip(self.buckets, _bands(entry[0])):
+                members = bucket[band]
+                members.remove(chunk_id)
+                if not members:
+                    del bucket[band]
+
+    def find(self, fingerprint, exclude_doc=None):
+        """ID of an indexed near-duplicate of the fingerprint, or None.
+
+        Chunks of ``exclude_doc`` are ignored, so a new version of a document
+        is not swallowed by the old version it is about to replace.
+        """
+        for bucket, band in zip(self.buckets, _bands(fingerprint)):
+            for chunk_id in bucket.get(band, ()):
+                other, doc_id = self.fingerprints[chunk_id]
+                if exclude_doc is not None and doc_id == exclude_doc:
+                    continue
+                if bin(other ^ fingerprint).count("1") <= MAX_DISTANCE:
+                    return chunk_id
+        return None
+
+
+class Deduplicator:
+    """Drops chunks that repeat one already in the store or earlier in the same stream.
+
+    ``duplicates`` collects (fingerprint, metadata) of every chunk skipped
+    in favour of another document's chunk, so the store can record which
+    documents share the kept one (``DocumentIndex.add_duplicates``).
+    """
+
+    def __init__(self, existing=None):
+        self.existing = existing
+        self.seen = NearDuplicateIndex()
+        self.skipped = 0
+        self.duplicates = []
+
+    def filter(self, chunks):
+        for position, chunk in enumerate(chunks):
+            fingerprint = simhash(chunk.page_content)
+            if fingerprint is not None:
+                doc_id = chunk.metadata.get("doc_id")
+                earlier = self.seen.find(fingerprint)
+                if earlier is not None or (
+                        self.existing is not None and self.existing.find(fingerprint, exclude_doc=doc_id) is not None):
+                    self.skipped += 1
+                    if doc_id is not None and (earlier is None or self.seen.fingerprints[earlier][1] != doc_id):
+                        self.duplicates.append((fingerprint, dict(chunk.metadata)))
+                    continue
+                self.seen.add_fingerprint(position, fingerprint, doc_id)
+            yield chunk
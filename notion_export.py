@@ -0,0 +1,211 @@
+import csv
+import html
+import io
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from collections import deque
+
+
+# =========================
+# 🔹 Notion Export Ingestion
+# =========================
+# Notion names every exported page and folder "<Title> <32 hex id>", puts
+# databases next to them as CSV (plus an "_all" variant with every view's
+# rows), and splits large exports into "Part-N" zips inside the outer zip.
+NOTION_ID = re.compile(r"\s+[0-9a-f]{32}$")
+# Members are grouped into tasks of about this many uncompressed bytes so a
+# worker round trip is never spent on a single small page.
+TASK_BYTES = 1 << 20
+
+# Lines without any of these characters are plain prose and pass through untouched.
+MARKUP = re.compile(r"[#>*_\-+|\[`<&~!]|^\s*\d+[.)]")
+FENCE = re.compile(r"^\s*(```|~~~)")
+BLOCK_PREFIX = re.compile(r"^\s{0,3}(?:#{1,6}\s+|>\s?|[-*+]\s+(?:\[[ xX]\]\s+)?|\d+[.)]\s+)")
+CLOSING_HASHES = re.compile(r"\s+#+\s*$")
+RULE = re.compile(r"^\s*([-*_])(?:\s*\1){2,}\s*$")
+TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(?:\|\s*:?-{3,}:?\s*)*\|?\s*$")
+IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+HTML_TAG = re.compile(r"</?[a-zA-Z][^>]*>")
+EMPHASIS = re.compile(r"\*\*|~~|`|\*|(?<!\w)__?|__?(?!\w)")
+
+
+def strip_markdown(lines):
+    """Plain text of markdown in one pass over its lines, keeping paragraph breaks"""
+    out = []
+    in_fence = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not in_fence and not MARKUP.search(line):
+            out.append(line.strip())
+            continue
+        if FENCE.match(line):
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            out.append(line)
+            continue
+        if RULE.match(line) or TABLE_SEPARATOR.match(line):
+            continue
+        heading = line.lstrip().startswith("#")
+        while True:
+            stripped = BLOCK_PREFIX.sub("", line, count=1)
+            if stripped == line:
+                break
+            line = stripped
+        if heading:
+            line = CLOSING_HASHES.sub("", line)
+        line = IMAGE.sub(r"\1", line)
+        line = LINK.sub(r"\1", line)
+        line = HTML_TAG.sub("", line)
+        line = EMPHASIS.sub("", line)
+        if "|" in line:
+            line = " ".join(cell.strip() for cell in line.strip().strip("|").split("|"))
+        if "&" in line:
+            line = html.unescape(line)
+        out.append(line.strip())
+    return "\n".join(out).strip()
+
+
+def csv_to_text(lines):
+    """One "column: value" line per database row"""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        return ""
+    rows = []
+    for row in reader:
+        fields = [f"{name}: {value}" for name, value in zip(header, row) if value.strip()]
+        if fields:
+            rows.append(" | ".join(fields))
+    return "\n".join(rows)
+
+
+def notion_name(name):
+    """Member or folder name without Notion's id suffix and extension"""
+    stem = name[:-len("_all.csv")] if name.endswith("_all.csv") else os.path.splitext(name)[0]
+    return NOTION_ID.sub("", stem)
+
+
+def page_path(member):
+    """Readable location of a page in the workspace, e.g. ``Team / Docs / Setup``"""
+    return " / ".join(notion_name(part) for part in member.split("/") if part)
+
+
+def _read_member(archive, name):
+    """(title, text) of one page or database, streamed line by line"""
+    with archive.open(name) as raw:
+        lines = io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+        if name.endswith(".csv"):
+            return notion_name(os.path.basename(name)), csv_to_text(lines)
+        first = next(lines, "")
+        title = first[2:].strip() if first.startswith("# ") else notion_name(os.path.basename(name))
+        return title, strip_markdown(_chain(first, lines))
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def _extract_members(path, prefix, names):
+    """Worker task: (member, title, path, text) for members of an export zip on disk"""
+    pages = []
+    with zipfile.ZipFile(path) as archive:
+        for name in names:
+            title, text = _read_member(archive, name)
+            if text.strip():
+                pages.append((prefix + name, title, page_path(name), text))
+    return pages
+
+
+def _spool(stream):
+    """Copy a zip stream to a temp file that workers can open by path"""
+    handle = tempfile.NamedTemporaryFile(suffix=".zip", delete=False)
+    with handle:
+        shutil.copyfileobj(stream, handle)
+    return handle.name
+
+
+def member_hash(info):
+    """Manifest hash of a zip member, from its CRC and size so nothing is decompressed"""
+    return f"{info.CRC:08x}-{info.file_size}"
+
+
+def _plan(path, spooled, prefix="", previous=None, hashes=None):
+    """Yield (path, prefix, member names) tasks for every page and database.
+
+    Nested zips are copied out to temp files (recorded in ``spooled``) and
+    planned in place, so workers never seek inside a compressed member.
+    Members whose hash is unchanged from ``previous`` are left out; the hash
+    of every member is recorded in ``hashes``.
+    """
+    with zipfile.ZipFile(path) as archive:
+        infos = [info for info in archive.infolist()
+                 if not info.is_dir() and not info.filename.startswith("__MACOSX/")]
+        names = {info.filename for info in infos}
+        batch, batch_bytes = [], 0
+        for info in infos:
+            name = info.filename
+            if name.endswith(".zip"):
+                with archive.open(name) as inner:
+                    spooled.append(_spool(inner))
+                yield from _plan(spooled[-1], spooled, f"{prefix}{name}/", previous, hashes)
+                continue
+            if not name.endswith((".md", ".csv")):
+                continue
+            # The "_all" CSV is a superset of the plain one.
+            if name.endswith(".csv") and not name.endswith("_all.csv") and name[:-4] + "_all.csv" in names:
+                continue
+            digest = member_hash(info)
+            if hashes is not None:
+                hashes[prefix + name] = digest
+            if previous is not None and previous.get(prefix + name) == digest:
+                continue
+            batch.append(name)
+            batch_bytes += info.file_size
+            if batch_bytes >= TASK_BYTES:
+                yield path, prefix, batch
+                batch, batch_bytes = [], 0
+        if batch:
+            yield path, prefix, batch
+
+
+def iter_notion_pages(file, executor=None, max_pending=None, previous=None, hashes=None):
+    """Yield (member, title, path, text) for every page and database of a Notion export.
+
+    Members are grouped into tasks that run on the pool with at most
+    ``max_pending`` in flight and are yielded in archive order. With a
+    ``previous`` {member: hash} manifest only new and changed members are
+    extracted; ``hashes`` receives the manifest of this export.
+    """
+    if hasattr(file, "seek"):
+        file.seek(0)
+    spooled = [_spool(file)]
+    tasks = _plan(spooled[0], spooled, previous=previous, hashes=hashes)
+    window = deque()
+    try:
+        if executor is None:
+            for task in tasks:
+                yield from _extract_members(*task)
+            return
+
+        max_pending = max_pending or getattr(executor, "_max_workers", 1) * 2
+        while True:
+            while len(window) < max_pending:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                window.append(executor.submit(_extract_members, *task))
+            if not window:
+                break
+            yield from window.popleft().result()
+    finally:
+        for future in window:
+            future.cancel()
+        tasks.close()
+        for path in spooled:
+            os.remove(path)
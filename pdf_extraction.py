@@ -0,0 +1,143 @@
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from PyPDF2 import PdfReader
+
+
+# =========================
+# 🔹 Parallel PDF Extraction
+# =========================
+# Below this many pages the cost of shipping work to another process
+# outweighs the extraction itself.
+MIN_PAGES_PER_TASK = 4
+
+
+def _page_hash(page):
+    """Digest of a page's content stream, which changes whenever its text does"""
+    contents = page.get_contents()
+    return hashlib.blake2b(contents.get_data() if contents is not None else b"", digest_size=16).hexdigest()
+
+
+def _extract_page_range(path, start, stop):
+    """Worker task: (text, hash) of pages [start, stop) of the PDF at path"""
+    reader = PdfReader(path)
+    return [(reader.pages[i].extract_text() or "", _page_hash(reader.pages[i])) for i in range(start, stop)]
+
+
+def pdf_page_hashes(file):
+    """{page number: content hash} of every page, without extracting any text"""
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return {number: _page_hash(page) for number, page in enumerate(PdfReader(file).pages, start=1)}
+
+
+def _runs(indices, max_length):
+    """[start, stop) ranges covering sorted page indices, at most max_length long"""
+    start = stop = None
+    for index in indices:
+        if start is not None and index == stop and stop - start < max_length:
+            stop += 1
+            continue
+        if start is not None:
+            yield start, stop
+        start, stop = index, index + 1
+    if start is not None:
+        yield start, stop
+
+
+def create_extraction_pool(max_workers=None):
+    """Process pool for extraction; spawned so workers never inherit server threads"""
+    return ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def _spool(file):
+    """Copy an uploaded file object to disk so workers can open it by path"""
+    if hasattr(file, "seek"):
+        file.seek(0)
+    handle = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    with handle:
+        shutil.copyfileobj(file, handle)
+    return handle.name
+
+
+def iter_pdf_pages(files, executor=None, max_pending=None, pages=None, hashes=None):
+    """Yield (file_index, page_number, text) for several PDFs in page order.
+
+    Pages of every file are split into ranges that are scheduled on the pool
+    in upload order with at most ``max_pending`` ranges in flight, so large
+    files are parallelised by page, small files by file, and memory stays
+    bounded by the window rather than by document size. A file that cannot
+    be opened yields ``(file_index, None, error)`` and is skipped.
+
+    ``pages`` optionally lists, per file, the page numbers to extract (None
+    for all of them); ``hashes`` is a per-file list of dicts that receive
+    the content hash of every extracted page.
+    """
+    paths = [_spool(file) for file in files]
+    window = deque()
+    try:
+        if executor is None:
+            for file_index, path in enumerate(paths):
+                try:
+                    reader = PdfReader(path)
+                except Exception as e:
+                    yield file_index, None, e
+                    continue
+                wanted = pages[file_index] if pages is not None else None
+                for page_number, page in enumerate(reader.pages, start=1):
+                    if wanted is not None and page_number not in wanted:
+                        continue
+                    if hashes is not None:
+                        hashes[file_index][page_number] = _page_hash(page)
+                    yield file_index, page_number, page.extract_text() or ""
+            return
+
+        workers = getattr(executor, "_max_workers", 1)
+        max_pending = max_pending or workers * 2
+
+        def plan():
+            for file_index, path in enumerate(paths):
+                try:
+                    page_count = len(PdfReader(path).pages)
+                except Exception as e:
+                    yield file_index, None, e
+                    continue
+                if pages is not None and pages[file_index] is not None:
+                    indices = sorted(number - 1 for number in pages[file_index] if 0 < number <= page_count)
+                else:
+                    indices = range(page_count)
+                per_task = max(MIN_PAGES_PER_TASK, -(-len(indices) // (workers * 2)))
+                for start, stop in _runs(indices, per_task):
+                    yield file_index, start, executor.submit(_extract_page_range, paths[file_index], start, stop)
+
+        tasks = plan()
+        while True:
+            while sum(1 for _, start, _ in window if start is not None) < max_pending:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                window.append(task)
+            if not window:
+                break
+            file_index, start, entry = window.popleft()
+            if start is None:
+                yield file_index, None, entry
+                continue
+            for page_number, (text, digest) in enumerate(entry.result(), start=start + 1):
+                if hashes is not None:
+                    hashes[file_index][page_number] = digest
+                yield file_index, page_number, text
+    finally:
+        for _, start, entry in window:
+            if start is not None:
+                entry.cancel()
+        for path in paths:
+            os.remove(path)
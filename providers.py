@@ -0,0 +1,144 @@
+import asyncio
+import re
+import time
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+# =========================
+# 🔹 Embedding & Chat Providers
+# =========================
+# Each provider maps to a pair of factories building its embeddings client
+# and its chat model; main.py picks one by configuration. "offline" needs no
+# network and is deterministic, for load tests and profiling.
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic embeddings from hashed word and character n-grams.
+
+    Every word and every character trigram of a text is hashed into one of
+    ``dim`` signed buckets and the result is L2-normalised, so texts sharing
+    vocabulary land near each other. ``latency`` seconds are slept per
+    request to stand in for a remote provider. Offline models are named
+    like ``offline/hashing-768``, the number being the dimension.
+    """
+
+    def __init__(self, dim=768, latency=0.0):
+        self.dim = dim
+        self.latency = latency
+
+    def _embed(self, text):
+        words = WORD_PATTERN.findall(text.lower())
+        features = words + [word[i:i + 3] for word in words for i in range(max(1, len(word) - 2))]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if features:
+            hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+            signs = np.where(hashes & 1, 1.0, -1.0).astype(np.float32)
+            np.add.at(vector, (hashes >> 1) % self.dim, signs)
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+
+class EchoChatModel:
+    """Templated stand-in for a chat model that answers from the prompt itself.
+
+    The answer restates the question and quotes the start of the retrieved
+    context, streamed word by word after ``latency`` seconds, with
+    ``token_latency`` seconds between words.
+    """
+
+    def __init__(self, latency=0.0, token_latency=0.0, max_words=120):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.max_words = max_words
+
+    def _answer(self, prompt):
+        prompt = getattr(prompt, "text", prompt)
+        question = re.search(r"Question:\s*(.*?)\s*Answer:", prompt, re.S)
+        context = re.search(r"Context:\s*(.*?)\s*Question:", prompt, re.S)
+        question = question.group(1) if question else prompt.strip().splitlines()[-1]
+        context = " ".join(context.group(1).split()[:self.max_words]) if context else ""
+        return f"(offline) You asked: {question}\n\nFrom the context: {context}"
+
+    def invoke(self, prompt, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return AIMessage(content=self._answer(prompt))
+
+    def stream(self, prompt, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        for i, word in enumerate(re.findall(r"\S+\s*", self._answer(prompt))):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield AIMessageChunk(content=word)
+
+
+def _google_embeddings(model, api_key, latency):
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    return GoogleGenerativeAIEmbeddings(model=model, google_api_key=api_key)
+
+
+def _google_chat(model, api_key, temperature, max_output_tokens, latency, token_latency):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        google_api_key=api_key
+    )
+
+
+def _offline_embeddings(model, api_key, latency):
+    dim = re.search(r"(\d+)$", model)
+    return HashingEmbeddings(dim=int(dim.group(1)) if dim else 768, latency=latency)
+
+
+def _offline_chat(model, api_key, temperature, max_output_tokens, latency, token_latency):
+    return EchoChatModel(latency=latency, token_latency=token_latency)
+
+
+PROVIDERS = {
+    "google": (_google_embeddings, _google_chat),
+    "offline": (_offline_embeddings, _offline_chat),
+}
+
+
+def _factories(provider):
+    try:
+        return PROVIDERS[provider]
+    except KeyError:
+        raise ValueError(f"Unknown provider {provider!r}; expected one of {', '.join(PROVIDERS)}") from None
+
+
+def create_embeddings(provider, model, api_key=None, latency=0.0):
+    """Embeddings client of the named provider"""
+    return _factories(provider)[0](model, api_key, latency)
+
+
+def create_chat_model(provider, model, api_key=None, temperature=0.1, max_output_tokens=1024,
+                      latency=0.0, token_latency=0.0):
+    """Chat model of the named provider; it offers invoke() and stream()"""
+    return _factories(provider)[1](model, api_key, temperature, max_output_tokens, latency, token_latency)
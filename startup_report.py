@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+# =========================
+# 🔹 Startup Import Report
+# =========================
+# Subsystems main.py loads on first use, by the feature that needs them.
+SUBSYSTEMS = {
+    "PDF": ["pdf_extraction", "ingestion"],
+    "Notion": ["notion_export", "ingestion"],
+    "Wiki": ["wiki_crawler", "html_extraction", "ingestion"],
+    "Embeddings": ["providers", "langchain_google_genai", "embedding_cache", "embedding_pipeline"],
+    "Vector store": ["vector_index", "index_snapshots", "index_tiering", "library", "near_duplicates"],
+    "Answering": ["providers", "answering", "answer_cache", "lexical_index", "langchain_google_genai"],
+}
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _importtime(code):
+    """Wall seconds and top-level (module, cumulative seconds) for running code in a fresh interpreter"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=HERE, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit() or name.startswith("  "):
+            continue
+        # Unindented names are imported directly by the code, not by another module.
+        modules.append((name.strip(), int(cumulative) / 1e6))
+    return wall, modules
+
+
+def startup_report(top=10):
+    """Import cost of the landing page and of each lazily loaded subsystem"""
+    # Streamlit's bare mode runs the script without a server; the landing page
+    # is what a fresh session renders first.
+    landing = (
+        "import runpy, logging; logging.disable(logging.WARNING); "
+        "runpy.run_path('main.py', run_name='__main__')"
+    )
+    wall, modules = _importtime(landing)
+    report = {
+        "landing_page": {
+            "wall_seconds": round(wall, 3),
+            "imports": [{"module": name, "seconds": round(seconds, 4)}
+                        for name, seconds in sorted(modules, key=lambda m: -m[1])[:top]],
+        },
+        "subsystems": {},
+    }
+    baseline, _ = _importtime("import streamlit")
+    for subsystem, names in SUBSYSTEMS.items():
+        try:
+            wall, modules = _importtime("import streamlit; " + "; ".join(f"import {name}" for name in names))
+        except RuntimeError as e:
+            report["subsystems"][subsystem] = {"error": str(e)}
+            continue
+        report["subsystems"][subsystem] = {
+            "extra_seconds": round(max(0.0, wall - baseline), 3),
+            "imports": {name: round(seconds, 4) for name, seconds in modules if name in names},
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show where IQBot's startup import time goes")
+    parser.add_argument("--top", type=int, default=10, help="landing-page imports to list")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = startup_report(args.top)
+    landing = report["landing_page"]
+    print(f"Landing page cold start: {landing['wall_seconds']:.3f}s")
+    for entry in landing["imports"]:
+        print(f"  {entry['module']:<40} {entry['seconds']:>8.3f}s")
+    print("Loaded on first use:")
+    for subsystem, entry in report["subsystems"].items():
+        if "error" in entry:
+            print(f"  {subsystem:<14} unavailable: {entry['error']}")
+            continue
+        slowest = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in
+                            sorted(entry["imports"].items(), key=lambda item: -item[1]))
+        print(f"  {subsystem:<14} +{entry['extra_seconds']:.3f}s  ({slowest})")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+
+
+# =========================
+# 🔹 Stage Telemetry
+# =========================
+# Upper bounds, in seconds, of the exported duration histogram buckets.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRIC_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class _NullSpan:
+    """Span handed out while telemetry is disabled; does nothing"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Timed block; ``self_seconds`` excludes time spent in spans opened inside it"""
+    __slots__ = ("telemetry", "name", "attrs", "_frame", "_started")
+
+    def __init__(self, telemetry, name, attrs):
+        self.telemetry = telemetry
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Attach attributes known only once the block has run"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._frame = self.telemetry._push()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._started
+        child = self.telemetry._pop(self._frame, elapsed)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.telemetry.record(self.name, elapsed, elapsed - child, **self.attrs)
+        return False
+
+
+class Telemetry:
+    """Process-wide spans and counters for ingestion and answering.
+
+    Disabled by default, in which case ``span`` returns a shared no-op,
+    ``timed`` returns its iterable untouched and ``count``/``record`` return
+    at once. When enabled, the last ``recent`` spans and per-name duration
+    statistics are kept in memory, and ``flush`` writes them to
+    ``export_path`` as Prometheus text (rewritten each time) or JSON lines
+    (appended).
+    """
+
+    def __init__(self, recent=200, window=200):
+        self.enabled = False
+        self.export_path = None
+        self.export_format = "prometheus"
+        self.recent = deque(maxlen=recent)
+        self.window = window
+        self.counters = {}
+        self._stats = {}
+        self._pending = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def configure(self, enabled, export_path=None, export_format="prometheus"):
+        if export_format not in ("prometheus", "jsonl"):
+            raise ValueError(f"Unknown telemetry export format {export_format!r}; expected prometheus or jsonl")
+        self.enabled = enabled
+        self.export_path = export_path or None
+        self.export_format = export_format
+
+    def _push(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = [0.0]
+        stack.append(frame)
+        return frame
+
+    def _pop(self, frame, elapsed):
+        stack = self._local.stack
+        stack.pop()
+        if stack:
+            stack[-1][0] += elapsed
+        return frame[0]
+
+    def span(self, name, **attrs):
+        """Context manager timing one stage"""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attrs)
+
+    def timed(self, name, iterable, **attrs):
+        """Pass a stream through, recording one span for the time spent producing it.
+
+        Streaming stages interleave, so the span's ``seconds`` add up the
+        time spent inside the stream rather than wall time, and
+        ``self_seconds`` leaves out streams it pulls from that are timed too.
+        """
+        if not self.enabled:
+            return iterable
+        return self._timed(name, iterable, attrs)
+
+    def _timed(self, name, iterable, attrs):
+        iterator = iter(iterable)
+        total = own = 0.0
+        items = 0
+        try:
+            while True:
+                frame = self._push()
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed = time.perf_counter() - started
+                    own += elapsed - self._pop(frame, elapsed)
+                    total += elapsed
+                items += 1
+                yield item
+        finally:
+            self.record(name, total, own, items=items, **attrs)
+
+    def record(self, name, seconds, self_seconds=None, **attrs):
+        """Record a span measured elsewhere, e.g. across an await"""
+        if not self.enabled:
+            return
+        entry = {"name": name, "at": time.time(), "seconds": seconds,
+                 "self_seconds": seconds if self_seconds is None else self_seconds, **attrs}
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {"count": 0, "sum": 0.0, "self_sum": 0.0, "buckets": [0] * len(BUCKETS),
+                                             "recent": deque(maxlen=self.window)}
+            stats["count"] += 1
+            stats["sum"] += seconds
+            stats["self_sum"] += entry["self_seconds"]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    stats["buckets"][i] += 1
+                    break
+            stats["recent"].append(seconds)
+            self.recent.append(entry)
+            if self.export_path and self.export_format == "jsonl":
+                self._pending.append(entry)
+
+    def count(self, name, value=1):
+        """Add to a counter such as chunks, tokens, cache hits or retries"""
+        if not self.enabled or not value:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        """Per-span count, mean, own mean, p50, p95 and last duration in seconds, busiest first"""
+        with self._lock:
+            stats = {name: (entry["count"], entry["sum"], entry["self_sum"], sorted(entry["recent"]), entry["recent"][-1])
+                     for name, entry in self._stats.items()}
+        rows = []
+        for name, (count, total, own, recent, last) in stats.items():
+            rows.append({
+                "name": name,
+                "count": count,
+                "mean": total / count,
+                "self_mean": own / count,
+                "p50": recent[len(recent) // 2],
+                "p95": recent[min(len(recent) - 1, int(len(recent) * 0.95))],
+                "last": last,
+                "total": total,
+            })
+        return sorted(rows, key=lambda row: -row["self_mean"] * row["count"])
+
+    def prometheus_text(self):
+        lines = ["# TYPE iqbot_span_seconds histogram"]
+        with self._lock:
+            for name, stats in sorted(self._stats.items()):
+                cumulative = 0
+                for bound, hits in zip(BUCKETS, stats["buckets"]):
+                    cumulative += hits
+                    lines.append(f'iqbot_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'iqbot_span_seconds_bucket{{span="{name}",le="+Inf"}} {stats["count"]}')
+                lines.append(f'iqbot_span_seconds_sum{{span="{name}"}} {stats["sum"]:.6f}')
+                lines.append(f'iqbot_span_seconds_count{{span="{name}"}} {stats["count"]}')
+            lines.append("# TYPE iqbot_span_self_seconds_total counter")
+            for name, stats in sorted(self._stats.items()):
+                lines.append(f'iqbot_span_self_seconds_total{{span="{name}"}} {stats["self_sum"]:.6f}')
+            for name, value in sorted(self.counters.items()):
+                metric = "iqbot_" + METRIC_NAME.sub("_", name) + "_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Write what has been recorded since the last flush to the export file"""
+        if not self.enabled or not self.export_path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.export_path))
+        os.makedirs(directory, exist_ok=True)
+        if self.export_format == "prometheus":
+            # Scrapers may read at any moment, so swap in a complete file.
+            fd, staging = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(staging, self.export_path)
+            return
+        with self._lock:
+            pending, self._pending = self._pending, []
+            counters = dict(self.counters)
+        with open(self.export_path, "a", encoding="utf-8") as f:
+            for entry in pending:
+                f.write(json.dumps({"type": "span", **entry}, default=str) + "\n")
+            f.write(json.dumps({"type": "counters", "at": time.time(), **counters}) + "\n")
+
+
+TELEMETRY = Telemetry()
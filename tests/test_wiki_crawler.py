@@ -0,0 +1,112 @@
+import hashlib
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from wiki_crawler import HttpCache, crawl, make_session
+
+
+def serve(pages):
+    """Start a local HTTP server for ``pages`` (path -> HTML) that answers conditional GETs.
+
+    Returns the server; ``server.requests`` lists (path, status) of every request.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path)
+            if body is None:
+                self._reply(404, b"", "text/plain")
+                return
+            etag = '"%s"' % hashlib.sha256(body.encode("utf-8")).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                self._reply(304, None, None, etag)
+                return
+            content_type = "text/plain" if self.path == "/robots.txt" else "text/html; charset=utf-8"
+            self._reply(200, body.encode("utf-8"), content_type, etag)
+
+        def _reply(self, status, body, content_type, etag=None):
+            server.requests.append((self.path, status))
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+            if body is not None:
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    return server
+
+
+def page(*links):
+    return "<html><body><main>" + "".join(f'<a href="{link}">{link}</a>' for link in links) + "</main></body></html>"
+
+
+class CrawlTest(unittest.TestCase):
+    def setUp(self):
+        self.offsite = serve({"/wiki/Elsewhere": page()})
+        self.offsite_url = f"http://127.0.0.1:{self.offsite.server_port}/wiki/Elsewhere"
+        self.site = serve({
+            "/robots.txt": "User-agent: *\nDisallow: /private/\n",
+            "/wiki/Seed": page("/wiki/A", "/wiki/B#History", "/private/Secret", self.offsite_url,
+                               "/wiki/Special:Random", "/w/index.php?title=Seed&action=edit"),
+            "/wiki/A": page("/wiki/C", "/wiki/Seed"),
+            "/wiki/B": page("/wiki/A"),
+            "/wiki/C": page(),
+            "/private/Secret": page(),
+        })
+        self.root = f"http://127.0.0.1:{self.site.server_port}"
+        self.session = make_session(retries=0)
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for server in (self.site, self.offsite):
+            server.shutdown()
+            server.server_close()
+        self.session.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def crawled(self, **options):
+        return [page.url[len(self.root):] for page in crawl(self.root + "/wiki/Seed", self.session, **options)]
+
+    def test_follows_links_up_to_max_depth(self):
+        self.assertEqual(self.crawled(max_depth=0), ["/wiki/Seed"])
+        self.assertEqual(self.crawled(max_depth=1), ["/wiki/Seed", "/wiki/A", "/wiki/B"])
+        self.assertEqual(self.crawled(max_depth=2), ["/wiki/Seed", "/wiki/A", "/wiki/B", "/wiki/C"])
+
+    def test_stops_at_max_pages(self):
+        self.assertEqual(self.crawled(max_depth=2, max_pages=2), ["/wiki/Seed", "/wiki/A"])
+
+    def test_honours_robots_txt(self):
+        self.crawled(max_depth=2)
+        paths = [path for path, _ in self.site.requests]
+        self.assertIn("/robots.txt", paths)
+        self.assertNotIn("/private/Secret", paths)
+
+    def test_stays_on_the_seed_site(self):
+        self.crawled(max_depth=2)
+        self.assertEqual(self.offsite.requests, [])
+        self.assertNotIn("/wiki/Special:Random", [path for path, _ in self.site.requests])
+
+    def test_revalidates_cached_pages_with_etag(self):
+        cache = HttpCache(self.cache_dir)
+        first = list(crawl(self.root + "/wiki/Seed", self.session, cache, max_depth=1))
+        self.site.requests.clear()
+        second = list(crawl(self.root + "/wiki/Seed", self.session, cache, max_depth=1))
+        self.assertEqual([page.body for page in second], [page.body for page in first])
+        statuses = {path: status for path, status in self.site.requests if path != "/robots.txt"}
+        self.assertEqual(statuses, {"/wiki/Seed": 304, "/wiki/A": 304, "/wiki/B": 304})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,286 @@
+import hashlib
+import threading
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from chunk_store import ChunkStore
+from index_tiering import apply_search_params, maybe_upgrade, remove_ids
+from lexical_index import LexicalIndex
+from near_duplicates import NearDuplicateIndex, simhash
+
+
+# =========================
+# 🔹 Document-aware Vector Index
+# =========================
+HASH_MODULUS = 2 ** 128
+
+
+def document_id(content_type, name):
+    """Stable ID for an uploaded source, e.g. ``PDF:handbook.pdf``"""
+    return f"{content_type}:{name}"
+
+
+def chunk_hash(text):
+    """128-bit content hash of a chunk, as an integer"""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest(), "big")
+
+
+class DocumentIndex(FAISS):
+    """FAISS store whose chunks can be removed one source document at a time.
+
+    Vectors live under integer IDs that are never reused, in an
+    ``IndexIDMap2`` or one of the ID-aware approximate tiers from
+    ``index_tiering``, and ``doc_chunks`` maps each chunk's ``doc_id`` metadata to those
+    IDs, so dropping a document only touches that document's entries instead
+    of rebuilding the whole store.
+
+    Chunk texts and metadata live in a ``ChunkStore`` under the same IDs,
+    which also serves as the FAISS ``docstore``; a chunk's docstore ID is
+    its integer ID as a string, so IDs cannot be chosen by the caller.
+
+    ``content_hash`` is the sum of all chunk hashes, kept up to date on every
+    add and remove, so two stores holding the same chunks share a
+    ``version`` whatever order they were built in.
+
+    ``lexical`` is a BM25 index over the same integer IDs, maintained
+    alongside the vectors so keyword search never needs a rebuild, and
+    ``near_duplicates`` holds their SimHash fingerprints for ingestion-time
+    deduplication. ``shared_chunks`` maps a chunk's ID to the metadata of
+    near-duplicates from other documents that were skipped in its favour;
+    when the chunk's own document goes, it is handed to one of those
+    documents instead of disappearing with it.
+
+    An index loaded from a snapshot may be memory-mapped (``index_mapped``);
+    FAISS cannot change a mapped index, so it is copied into private memory
+    just before the first add or remove.
+
+    Reads and writes hold ``lock``, so a background ingestion can publish
+    batches while questions are answered; each added batch or removal
+    becomes visible all at once.
+    """
+
+    def __init__(self, embedding_function, index, chunks=None, doc_chunks=None,
+                 content_hash=None, lexical=None, near_duplicates=None, shared_chunks=None,
+                 index_mapped=False, **kwargs):
+        chunks = chunks if chunks is not None else ChunkStore()
+        super().__init__(embedding_function, index, chunks, chunks.id_map, **kwargs)
+        self.chunks = chunks
+        self.index_mapped = index_mapped
+        self.doc_chunks = doc_chunks if doc_chunks is not None else {}
+        if content_hash is None:
+            content_hash = sum(chunk_hash(chunks.text(i)) for i in chunks.ids()) % HASH_MODULUS
+        self.content_hash = content_hash
+        if lexical is None or near_duplicates is None:
+            faiss_ids = list(chunks.ids())
+            texts = [chunks.text(i) for i in faiss_ids]
+            if lexical is None:
+                lexical = LexicalIndex()
+                lexical.add(faiss_ids, texts)
+            if near_duplicates is None:
+                near_duplicates = NearDuplicateIndex()
+                near_duplicates.add(faiss_ids, texts, [chunks.value(i, "doc_id") for i in faiss_ids])
+        self.lexical = lexical
+        self.near_duplicates = near_duplicates
+        self.shared_chunks = shared_chunks if shared_chunks is not None else {}
+        self.lock = threading.RLock()
+
+    @property
+    def version(self):
+        """Identifies the exact set of chunks in the store"""
+        return f"{self.content_hash:032x}"
+
+    @property
+    def next_id(self):
+        """Integer ID the next chunk will get; IDs are never reused"""
+        return self.chunks.next_id
+
+    @classmethod
+    def empty(cls, embedding_function, dim):
+        """New store for vectors of the given dimension"""
+        index = faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+        return cls(embedding_function, index)
+
+    def _own_index(self):
+        """Copy a memory-mapped index into private memory so it can be changed"""
+        if self.index_mapped:
+            self.index = faiss.deserialize_index(faiss.serialize_index(self.index))
+            self.index_mapped = False
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs):
+        with self.lock:
+            return self._add_embeddings(text_embeddings, metadatas, ids)
+
+    def _add_embeddings(self, text_embeddings, metadatas, ids):
+        if ids is not None:
+            raise ValueError("Chunk IDs are assigned by the index")
+        texts, vectors = zip(*text_embeddings)
+        metadatas = metadatas or [{} for _ in texts]
+
+        faiss_ids = np.arange(self.next_id, self.next_id + len(texts), dtype=np.int64)
+        self._own_index()
+        self.index.add_with_ids(np.asarray(vectors, dtype=np.float32), faiss_ids)
+        faiss_ids = faiss_ids.tolist()
+        self.chunks.add(faiss_ids, texts, metadatas)
+
+        for text in texts:
+            self.content_hash = (self.content_hash + chunk_hash(text)) % HASH_MODULUS
+        self.lexical.add(faiss_ids, texts)
+        self.near_duplicates.add(faiss_ids, texts, [metadata.get("doc_id") for metadata in metadatas])
+        for faiss_id, metadata in zip(faiss_ids, metadatas):
+            if metadata.get("doc_id"):
+                self.doc_chunks.setdefault(metadata["doc_id"], []).append(faiss_id)
+        return [str(faiss_id) for faiss_id in faiss_ids]
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        vectors = self.embedding_function.embed_documents(texts)
+        return self.add_embeddings(zip(texts, vectors), metadatas=metadatas, ids=ids)
+
+    def _remove(self, faiss_ids):
+        if not faiss_ids:
+            return 0
+        self._own_index()
+        self.index = remove_ids(self.index, faiss_ids)
+        texts = [self.chunks.text(faiss_id) for faiss_id in faiss_ids]
+        for text in texts:
+            self.content_hash = (self.content_hash - chunk_hash(text)) % HASH_MODULUS
+        self.lexical.remove(faiss_ids, texts)
+        self.near_duplicates.remove(faiss_ids)
+        self.chunks.remove(faiss_ids)
+        for faiss_id in faiss_ids:
+            self.shared_chunks.pop(faiss_id, None)
+        return len(faiss_ids)
+
+    def add_duplicates(self, duplicates):
+        """Record skipped near-duplicates, (fingerprint, metadata) pairs, on the chunks kept instead"""
+        with self.lock:
+            for fingerprint, metadata in duplicates:
+                faiss_id = self.near_duplicates.find(fingerprint, exclude_doc=metadata.get("doc_id"))
+                if faiss_id is not None:
+                    self.shared_chunks.setdefault(faiss_id, []).append(metadata)
+
+    def document_duplicates(self, doc_id):
+        """Metadata of a document's chunks that were skipped as near-duplicates of other documents' chunks"""
+        with self.lock:
+            return [metadata for records in self.shared_chunks.values() for metadata in records
+                    if metadata.get("doc_id") == doc_id]
+
+    def forget_duplicates(self, records):
+        """Drop skipped near-duplicates returned by document_duplicates"""
+        forget = {id(metadata) for metadata in records}
+        with self.lock:
+            for faiss_id in list(self.shared_chunks):
+                kept = [metadata for metadata in self.shared_chunks[faiss_id] if id(metadata) not in forget]
+                if kept:
+                    self.shared_chunks[faiss_id] = kept
+                else:
+                    del self.shared_chunks[faiss_id]
+
+    def _hand_over(self, shared):
+        """Keep removed chunks that other documents share, as (text, vector, records) triples"""
+        for text, vector, records in shared:
+            survivor = self.near_duplicates.find(simhash(text))
+            if survivor is not None:
+                # Another near-duplicate is still indexed; it now stands in for these documents.
+                owner = self.chunks.value(survivor, "doc_id")
+                records = [metadata for metadata in records if metadata.get("doc_id") != owner]
+                if records:
+                    self.shared_chunks.setdefault(survivor, []).extend(records)
+                continue
+            faiss_id = int(self._add_embeddings([(text, vector)], [records[0]], None)[0])
+            if records[1:]:
+                self.shared_chunks[faiss_id] = records[1:]
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        with self.lock:
+            return super().similarity_search_with_score_by_vector(embedding, k=k, **kwargs)
+
+    def lexical_search(self, query, k=5):
+        """Top-k chunks by BM25 as (Document, score) pairs, best first"""
+        with self.lock:
+            return [(self.chunks.document(faiss_id), score) for faiss_id, score in self.lexical.search(query, k)]
+
+    def stored_vectors(self, documents):
+        """Vectors of chunks this store returned, read back from the index; None for any other chunk"""
+        vectors = []
+        with self.lock:
+            for document in documents:
+                faiss_id = int(document.id) if document.id and document.id.isdigit() else None
+                if faiss_id is None or faiss_id not in self.chunks:
+                    vectors.append(None)
+                else:
+                    vectors.append(self.index.reconstruct(faiss_id))
+        return vectors
+
+    def document_chunk_ids(self, doc_id):
+        """Integer IDs currently indexed for a document"""
+        with self.lock:
+            return list(self.doc_chunks.get(doc_id, ()))
+
+    def document_chunks(self, doc_id):
+        """A document's chunks as currently indexed"""
+        with self.lock:
+            return [self.chunks.document(faiss_id) for faiss_id in self.doc_chunks.get(doc_id, ())]
+
+    def unit_chunk_ids(self, doc_id, key, units):
+        """Integer IDs of a document's chunks whose ``key`` metadata is one of units"""
+        units = set(units)
+        with self.lock:
+            return [
+                faiss_id for faiss_id in self.doc_chunks.get(doc_id, ())
+                if self.chunks.value(faiss_id, key) in units
+            ]
+
+    def remove_document(self, doc_id, faiss_ids=None):
+        """Remove a document's chunks (or just the given subset) and return how many went"""
+        with self.lock:
+            return self._remove_document(doc_id, faiss_ids)
+
+    def _remove_document(self, doc_id, faiss_ids):
+        current = self.doc_chunks.get(doc_id, [])
+        if faiss_ids is None:
+            faiss_ids = current
+            # The whole document goes, including the copies it shared with others.
+            self.forget_duplicates(self.document_duplicates(doc_id))
+        doomed = set(faiss_ids)
+        remaining = [faiss_id for faiss_id in current if faiss_id not in doomed]
+        if remaining:
+            self.doc_chunks[doc_id] = remaining
+        else:
+            self.doc_chunks.pop(doc_id, None)
+        faiss_ids = [faiss_id for faiss_id in faiss_ids if faiss_id in self.chunks]
+        shared = [
+            (self.chunks.text(faiss_id), self.index.reconstruct(faiss_id), self.shared_chunks[faiss_id])
+            for faiss_id in faiss_ids if self.shared_chunks.get(faiss_id)
+        ]
+        removed = self._remove(faiss_ids)
+        self._hand_over(shared)
+        return removed
+
+    def delete(self, ids=None, **kwargs):
+        """Delete chunks by docstore ID"""
+        if ids is None:
+            raise ValueError("No ids provided to delete.")
+        with self.lock:
+            by_doc = {}
+            for faiss_id in {int(id_) for id_ in ids}:
+                if faiss_id in self.chunks:
+                    by_doc.setdefault(self.chunks.value(faiss_id, "doc_id"), []).append(faiss_id)
+            for doc_id, faiss_ids in by_doc.items():
+                if doc_id is None:
+                    self._remove(faiss_ids)
+                else:
+                    self._remove_document(doc_id, faiss_ids)
+        return True
+
+    def apply_tier_policy(self, policy):
+        """Move to an approximate index once the policy's threshold is crossed"""
+        with self.lock:
+            upgraded = maybe_upgrade(self.index, policy)
+            if upgraded is not None:
+                self.index = upgraded
+                self.index_mapped = False
+            apply_search_params(self.index, policy)
+        return upgraded is not None
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urldefrag, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# =========================
+# 🔹 Wiki Crawler
+# =========================
+USER_AGENT = "NoteBot/1.0 (Educational Use)"
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+Page = namedtuple("Page", "url depth content_type body")
+
+
+def make_session(pool_size=8, retries=2):
+    """Keep-alive session whose connection pool is sized for the crawler's workers"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+class HttpCache:
+    """On-disk cache of GET responses, revalidated with ETag / If-Modified-Since.
+
+    Each URL is stored as ``<hash>.body`` plus a ``<hash>.json`` holding its
+    validators, content type and, when the server sent ``max-age``, the time
+    until which it can be served without asking the server at all.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url, suffix):
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest()[:40] + suffix)
+
+    def get(self, url):
+        """(meta, body) cached for url, or None"""
+        try:
+            with open(self._path(url, ".json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self._path(url, ".body"), "rb") as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path, data):
+        fd, staging = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(staging, path)
+
+    def put(self, url, headers, body=None):
+        """Record a response's validators, and its body unless it was a 304"""
+        cache_control = headers.get("Cache-Control", "")
+        max_age = MAX_AGE.search(cache_control)
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "content_type": headers.get("Content-Type", ""),
+            "fresh_until": time.time() + int(max_age.group(1))
+            if max_age and "no-cache" not in cache_control and "no-store" not in cache_control else 0,
+        }
+        if body is not None:
+            self._write(self._path(url, ".body"), body)
+        else:
+            # A 304 may omit headers the original response had.
+            previous = self.get(url)
+            if previous is not None:
+                meta = {key: value or previous[0].get(key) for key, value in meta.items()}
+        self._write(self._path(url, ".json"), json.dumps(meta).encode("utf-8"))
+
+
+def fetch(session, url, cache=None, timeout=10):
+    """GET url through the cache; returns (content_type, body)"""
+    cached = cache.get(url) if cache is not None else None
+    headers = {}
+    if cached is not None:
+        meta, body = cached
+        if meta.get("fresh_until", 0) > time.time():
+            return meta["content_type"], body
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached is not None:
+        cache.put(url, response.headers)
+        return cached[0]["content_type"], cached[1]
+    response.raise_for_status()
+    if cache is not None:
+        cache.put(url, response.headers, response.content)
+    return response.headers.get("Content-Type", ""), response.content
+
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+
+
+def decode_body(content_type, body):
+    """Body text using the charset the server declared, falling back to UTF-8"""
+    match = re.search(r"charset=([\w-]+)", content_type or "")
+    try:
+        return body.decode(match.group(1) if match else "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def same_site_links(page_url, html):
+    """Absolute, fragment-free links on a page that stay on its host.
+
+    Links with a query string and MediaWiki namespace pages
+    (``Special:``, ``Talk:``, ``File:``...) are edit, history or media views
+    rather than content and are left out.
+    """
+    parser = _LinkParser()
+    parser.feed(html)
+    host = urlparse(page_url).netloc
+    links = []
+    for href in parser.links:
+        url, _ = urldefrag(urljoin(page_url, href))
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or parsed.netloc != host or parsed.query:
+            continue
+        if ":" in parsed.path.rsplit("/", 1)[-1]:
+            continue
+        links.append(url)
+    return links
+
+
+class RobotsRules:
+    """robots.txt of every host a crawl touches, fetched once per host"""
+
+    def __init__(self, session, timeout=10):
+        self.session = session
+        self.timeout = timeout
+        self._parsers = {}
+        self._lock = threading.Lock()
+
+    def allowed(self, url):
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        with self._lock:
+            parser = self._parsers.get(origin)
+            if parser is None:
+                parser = RobotFileParser()
+                try:
+                    response = self.session.get(origin + "/robots.txt", timeout=self.timeout)
+                    # Missing robots.txt allows everything; an error status disallows.
+                    if response.status_code >= 500 or response.status_code in (401, 403):
+                        parser.disallow_all = True
+                    elif response.ok:
+                        parser.parse(response.text.splitlines())
+                    else:
+                        parser.allow_all = True
+                except requests.RequestException:
+                    parser.allow_all = True
+                self._parsers[origin] = parser
+        return parser.can_fetch(USER_AGENT, url)
+
+
+def crawl(seed, session, cache=None, max_depth=1, max_pages=50, workers=8, timeout=10):
+    """Yield the HTML pages reachable from seed, breadth first.
+
+    Same-site links are followed up to ``max_depth`` hops and ``max_pages``
+    pages, each level fetched concurrently on ``workers`` threads and
+    yielded in link order. Followed links must be allowed by robots.txt;
+    the seed is fetched regardless since the user asked for it. A seed that
+    cannot be fetched raises; other failed pages are skipped.
+    """
+    robots = RobotsRules(session, timeout)
+    seed, _ = urldefrag(seed)
+    seen = {seed}
+    frontier = [seed]
+    fetched = 0
+
+    def get(url):
+        try:
+            return fetch(session, url, cache, timeout)
+        except requests.RequestException as e:
+            if url == seed:
+                raise
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for depth in range(max_depth + 1):
+            frontier = frontier[:max_pages - fetched]
+            if not frontier:
+                break
+            next_frontier = []
+            for url, (content_type, body) in zip(frontier, executor.map(get, frontier)):
+                if content_type is None or (content_type and "html" not in content_type and url != seed):
+                    continue
+                fetched += 1
+                yield Page(url, depth, content_type, body)
+                if depth == max_depth:
+                    continue
+                for link in same_site_links(url, decode_body(content_type, body)):
+                    if link not in seen:
+                        seen.add(link)
+                        if robots.allowed(link):
+                            next_frontier.append(link)
+            frontier = next_frontier